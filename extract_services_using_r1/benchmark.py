@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from metrics import load_last_run, percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = {
+    "process": ["--mode", "process"],
+    "async": ["--mode", "async"],
+    "async-stream": ["--mode", "async", "--stream"],
+    "async-cascade": ["--mode", "async", "--stream", "--cascade", "accounts/fireworks/models/deepseek-v3"],
+}
+METHOD = """
+  async {name}(input: {type}Input): Promise<{type}> {{
+    const entity = this.{service}.create({{ ...input, updatedAt: new Date() }});
+    this.logger.log(`{name} ${{entity.id}}`);
+    return this.{service}.{call}(entity);
+  }}
+"""
+
+
+def synthetic_source(filename, mean_bytes):
+    """
+    Stand-in for a source file that is not available locally: a NestJS-like
+    service whose size is log-normally distributed around mean_bytes,
+    seeded by the file name so every run sees the same workload.
+    """
+    rng = random.Random(filename)
+    target = int(rng.lognormvariate(0, 0.6) * mean_bytes)
+    entity = os.path.splitext(os.path.basename(filename))[0].title().replace('-', '').replace('.', '')
+    parts = [f"import {{ Injectable }} from '@nestjs/common';\n\n@Injectable()\nexport class {entity}Service {{\n"]
+    size = len(parts[0])
+    i = 0
+    while size < target:
+        method = METHOD.format(name=f"handle{i}", type=entity, service=rng.choice(["repository", "queue", "cache"]),
+                               call=rng.choice(["save", "insert", "update", "add", "set"]))
+        parts.append(method)
+        size += len(method)
+        i += 1
+    parts.append("}\n")
+    return "".join(parts)
+
+
+def prepare_sources(file_info, source_root, directory, mean_bytes):
+    """
+    Use the real sources when they are present under source_root, otherwise
+    write synthetic ones to directory. Returns the root to run against.
+    """
+    missing = [item for item in file_info if not os.path.exists(os.path.join(source_root, item['filename']))]
+    if not missing:
+        return source_root
+    if len(missing) < len(file_info):
+        print(f"{len(missing)} of {len(file_info)} sources missing under {source_root}, using synthetic sources for all")
+    for item in file_info:
+        path = os.path.join(directory, item['filename'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(synthetic_source(item['filename'], mean_bytes))
+    return directory
+
+
+def start_mock_server(mock_args):
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, "mock_server.py"), "--port", "0"] + mock_args,
+                              stdout=subprocess.PIPE, text=True)
+    # "Mock chat completions at http://host:port/v1/chat/completions"
+    line = server.stdout.readline()
+    if not line:
+        raise RuntimeError("mock_server.py did not start")
+    return server, line.split(" at ", 1)[1].strip()
+
+
+def run_mode(mode, args, api_url, source_root, file_info, directory):
+    """
+    Run ext_service.py on the workload in a fresh process and working
+    directory. The memory peak is that of the largest process of the run.
+    """
+    workdir = os.path.join(directory, mode)
+    os.makedirs(workdir)
+    with open(os.path.join(workdir, 'sink_files.json'), 'w') as f:
+        json.dump(file_info, f)
+    command = [sys.executable, os.path.join(HERE, "ext_service.py"), *MODES[mode],
+               "--concurrency", str(args.concurrency), "--no-cache", "--metrics", "metrics.jsonl",
+               "--api-url", api_url, *shlex.split(args.ext_args)]
+    env = dict(os.environ, SOURCE_ROOT=source_root)
+    env.setdefault("OPENAI_API_KEY", "mock")
+    with open(os.path.join(workdir, "ext_service.log"), 'w') as log:
+        started = time.time()
+        process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall = time.time() - started
+    if status:
+        print(f"{mode}: ext_service exited with status {status}, see {workdir}/ext_service.log")
+
+    run = load_last_run(os.path.join(workdir, "metrics.jsonl"))
+    requests = [r for r in run["requests"] if not r.get("cached")]
+    latencies = [r["ended"] - r["started"] for r in requests]
+    return {
+        "mode": mode,
+        "files": sum(1 for f in run["files"] if f["status"] == "ok"),
+        "failed": sum(1 for f in run["files"] if f["status"] != "ok"),
+        "seconds": wall,
+        "files_per_second": sum(1 for f in run["files"] if f["status"] == "ok") / wall,
+        "peak_rss_mb": rusage.ru_maxrss / 1024,
+        "retries": sum(r.get("retries", 0) for r in requests),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark ext_service.py execution modes against mock_server.py. "
+                    "Unrecognized options are passed on to mock_server.py, e.g. --ttft 0.5 --error-rate 0.02")
+    parser.add_argument("--files", default="sink_files.json", help="workload, in sink_files.json format")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N files")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma separated, from {', '.join(MODES)}")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--source-root", default=os.getenv("SOURCE_ROOT", "/home/suchitg/DataCare"))
+    parser.add_argument("--synthetic-bytes", type=int, default=6000,
+                        help="mean size of the synthetic sources used when the real ones are missing")
+    parser.add_argument("--ext-args", default="", help="extra ext_service.py arguments, e.g. '--max-retries 8'")
+    parser.add_argument("--output", default=None, help="also write the results as JSON to this file")
+    args, mock_args = parser.parse_known_args()
+
+    with open(args.files, 'r') as f:
+        file_info = json.load(f)[:args.limit]
+    with tempfile.TemporaryDirectory(prefix="ext_benchmark_") as directory:
+        source_root = prepare_sources(file_info, args.source_root, os.path.join(directory, "sources"),
+                                      args.synthetic_bytes)
+        server, api_url = start_mock_server(mock_args)
+        results = []
+        try:
+            for mode in args.modes.split(","):
+                print(f"Running {mode} on {len(file_info)} files...", flush=True)
+                results.append(run_mode(mode, args, api_url, source_root, file_info, directory))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{'mode':<14}{'files':>7}{'failed':>8}{'files/s':>9}{'peak MB':>9}{'retries':>9}"
+          f"{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}{'max s':>8}")
+    for r in results:
+        print(f"{r['mode']:<14}{r['files']:>7}{r['failed']:>8}{r['files_per_second']:>9.2f}{r['peak_rss_mb']:>9.1f}"
+              f"{r['retries']:>9}{r['p50']:>8.2f}{r['p95']:>8.2f}{r['p99']:>8.2f}{r['max']:>8.2f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"concurrency": args.concurrency, "mock_args": mock_args, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+from chunking import estimate_tokens
+from metrics import percentile
+from sink_rules import NON_COVERING_RULES, extract as extract_sinks
+
+REASONING_MODEL = "accounts/fireworks/models/deepseek-r1"
+TRIGGERS = ("invalid", "empty", "confidence", "rules", "size")
+DEFAULT_TRIGGERS = ("invalid", "confidence", "rules", "size")
+
+# Appended to the user message of the non-reasoning tiers, single file or packed
+confidence_prompt = """
+Also add a "confidence" field: a number between 0 and 1 saying how sure you are that the list of detected data sink services is complete and correct. For a single file, put it at the top level of your answer object; when your answer has an entry for every file, put one in each file's entry, next to its "detected_data_sink_services"."""
+
+
+def service_name(name):
+    # "this.userRepository" and "UserRepository" name the same service
+    name = str(name or "").strip().lower()
+    return name[len("this."):] if name.startswith("this.") else name
+
+
+def make_tiers(fast_models, fast_max_tokens=4096):
+    """
+    Tiers in escalation order: the fast models, then deepseek-r1 with the
+    usual 32k token budget. Only the last tier reasons and streams.
+    """
+    tiers = [{"name": model.rsplit("/", 1)[-1], "model": model, "max_tokens": fast_max_tokens, "confidence": True}
+             for model in fast_models]
+    tiers.append({"name": REASONING_MODEL.rsplit("/", 1)[-1], "model": REASONING_MODEL, "max_tokens": 32768,
+                  "reasoning": True})
+    return tiers
+
+
+class Cascade:
+    """
+    Decides which tier a file starts at and whether a tier's answer is good
+    enough to keep. A file escalates to the next tier when an enabled
+    trigger fires:
+      invalid     the request failed or the answer is empty or not valid JSON
+      empty       no data sink services detected
+      confidence  self-reported confidence below min_confidence (or missing)
+      rules       the local rules (sink_rules.py) found a persisting service the
+                  answer lacks (names compared without case or `this.`)
+      size        the file is over max_file_tokens; it starts at the last tier
+    Keeps per-tier counts and latencies for report().
+    """
+
+    def __init__(self, tiers, triggers=DEFAULT_TRIGGERS, min_confidence=0.7, max_file_tokens=4000):
+        unknown = set(triggers) - set(TRIGGERS)
+        if unknown:
+            raise ValueError(f"Unknown escalation triggers: {', '.join(sorted(unknown))}")
+        self.tiers = tiers
+        self.triggers = set(triggers)
+        self.min_confidence = min_confidence
+        self.max_file_tokens = max_file_tokens
+        self.stats = [{"finished": 0, "escalated": {}, "seconds": []} for _ in tiers]
+
+    def last(self, tier):
+        return tier == len(self.tiers) - 1
+
+    def first_tier(self, file_content):
+        if "size" in self.triggers and estimate_tokens(file_content) > self.max_file_tokens:
+            return len(self.tiers) - 1
+        return 0
+
+    def check(self, tier, record, file_content):
+        """
+        Reason to escalate a file answered by `tier` (record None when the
+        request or parse failed), or None to keep the answer.
+        """
+        if self.last(tier):
+            return None
+        if record is None:
+            return "invalid" if "invalid" in self.triggers else None
+        message = record.get("message")
+        services = message.get("detected_data_sink_services") if isinstance(message, dict) else None
+        if not isinstance(services, list):
+            return "invalid" if "invalid" in self.triggers else None
+        if "empty" in self.triggers and not services:
+            return "empty"
+        if "confidence" in self.triggers:
+            confidence = message.get("confidence")
+            if not isinstance(confidence, (int, float)) or confidence < self.min_confidence:
+                return "confidence"
+        if "rules" in self.triggers:
+            answered = {service_name(service.get("service")) for service in services if isinstance(service, dict)}
+            if any(service_name(candidate["service"]) not in answered for candidate in extract_sinks(file_content)[0]
+                   if candidate["rule"] not in NON_COVERING_RULES):
+                return "rules"
+        return None
+
+    def escalated(self, tier, reason, seconds):
+        self.stats[tier]["escalated"][reason] = self.stats[tier]["escalated"].get(reason, 0) + 1
+        self.stats[tier]["seconds"].append(seconds)
+
+    def finished(self, tier, seconds):
+        self.stats[tier]["finished"] += 1
+        self.stats[tier]["seconds"].append(seconds)
+
+    def summary(self):
+        return [{
+            "tier": tier["name"],
+            "model": tier["model"],
+            "finished": stats["finished"],
+            "escalated": dict(stats["escalated"]),
+            "p50_seconds": percentile(stats["seconds"], 50),
+            "p95_seconds": percentile(stats["seconds"], 95),
+        } for tier, stats in zip(self.tiers, self.stats)]
+
+    def report(self):
+        print(f"{'tier':<28}{'finished':>9}{'escalated':>10}{'p50 s':>8}{'p95 s':>8}  reasons")
+        for row in self.summary():
+            reasons = ", ".join(f"{reason} {count}" for reason, count in sorted(row["escalated"].items()))
+            print(f"{row['tier']:<28}{row['finished']:>9}{sum(row['escalated'].values()):>10}"
+                  f"{row['p50_seconds']:>8.2f}{row['p95_seconds']:>8.2f}  {reasons}")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+import json
+import os
+
+from json_output import write_json_array
+
+
+def read_checkpoint(path):
+    """
+    Yield (start, end, record) for every complete line of a JSONL checkpoint,
+    with start/end as byte offsets. A torn last line from a crash mid-write
+    is ignored.
+    """
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            yield offset, offset + len(line), record
+            offset += len(line)
+
+
+class CheckpointWriter:
+    """
+    Append-only JSONL log of finished extractions. Every record is flushed
+    to disk as soon as it is written, so a crash only loses in-flight calls
+    and a restart can skip everything listed in `done`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        valid_bytes = 0
+        for _, end, record in read_checkpoint(path):
+            self.done.add(record['filename'])
+            valid_bytes = end
+        self.f = open(path, 'ab')
+        # Cut off a torn last line so new records start on a fresh line
+        self.f.truncate(valid_bytes)
+
+    def write(self, record):
+        self.f.write(json.dumps(record).encode('utf-8') + b'\n')
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.done.add(record['filename'])
+
+    def close(self):
+        self.f.close()
+
+
+def compact_checkpoint(path, output_path, order):
+    """
+    Write the checkpoint out as the usual indented JSON array, in the order
+    of the `order` filenames. Only byte offsets are kept in memory; records
+    are read back one at a time.
+    """
+    offsets = {}
+    for start, _, record in read_checkpoint(path):
+        offsets[record['filename']] = start
+    with open(path, 'rb') as src:
+        def records():
+            for filename in order:
+                if filename in offsets:
+                    src.seek(offsets[filename])
+                    yield json.loads(src.readline())
+
+        return write_json_array(records(), output_path)
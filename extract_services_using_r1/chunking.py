@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import re
+
+# Top-level (column 0) lines that start a new TS/JS declaration
+DECLARATION = re.compile(
+    r'^(?:export\s+|default\s+|declare\s+|abstract\s+|async\s+)*'
+    r'(?:function|class|const|let|var|interface|type|enum|namespace)\b'
+    r'|^export\b'
+)
+# Lines that belong to the declaration that follows them
+LEADING = re.compile(r'^(?:\s*$|@\w|//|/\*)')
+IMPORT_START = re.compile(r'^import\b')
+IMPORT_END = re.compile(r'''(?:\bfrom\s*['"][^'"]+['"]|^import\s*['"][^'"]+['"])\s*;?\s*$''')
+REQUIRE = re.compile(r'''^(?:const|let|var)\s+.*=\s*require\(['"][^'"]+['"]\)''')
+
+
+def estimate_tokens(text):
+    # No tokenizer is available for R1 here; ~4 characters per token is close
+    # enough for budgeting TypeScript source
+    return (len(text) + 3) // 4
+
+
+def split_imports(file_content):
+    """
+    Split a source file into its import header and the remaining lines.
+    """
+    header = []
+    body = []
+    in_import = False
+    for line in file_content.splitlines():
+        if in_import:
+            header.append(line)
+            in_import = not IMPORT_END.search(line)
+        elif IMPORT_START.match(line) or REQUIRE.match(line):
+            header.append(line)
+            in_import = IMPORT_START.match(line) is not None and not IMPORT_END.search(line)
+        else:
+            body.append(line)
+    return "\n".join(header), body
+
+
+def split_declarations(lines):
+    """
+    Group lines into top-level declarations. Comments and decorators directly
+    above a declaration stay with it.
+    """
+    units = []
+    current = []
+    leading = []
+    for line in lines:
+        if DECLARATION.match(line) and current:
+            units.append(current)
+            current = leading + [line]
+            leading = []
+        elif LEADING.match(line) or (leading and line.startswith(' *')):
+            leading.append(line)
+        else:
+            current.extend(leading)
+            current.append(line)
+            leading = []
+    current.extend(leading)
+    if current:
+        units.append(current)
+    return ["\n".join(unit) for unit in units]
+
+
+def split_oversized(unit, max_tokens):
+    pieces = []
+    current = []
+    size = 0
+    for line in unit.splitlines():
+        line_tokens = estimate_tokens(line) + 1
+        if current and size + line_tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += line_tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def chunk_source(file_content, max_tokens):
+    """
+    Split a file on top-level declaration boundaries into chunks of at most
+    `max_tokens` (estimated), each prefixed with the file's imports. Files
+    that already fit are returned as a single unchanged chunk.
+    """
+    if estimate_tokens(file_content) <= max_tokens:
+        return [file_content]
+    header, body = split_imports(file_content)
+    budget = max(max_tokens - estimate_tokens(header), max_tokens // 4)
+
+    chunks = []
+    current = []
+    size = 0
+    for unit in split_declarations(body):
+        for piece in (split_oversized(unit, budget) if estimate_tokens(unit) > budget else [unit]):
+            piece_tokens = estimate_tokens(piece) + 1
+            if current and size + piece_tokens > budget:
+                chunks.append("\n".join(current))
+                current = []
+                size = 0
+            current.append(piece)
+            size += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    chunks = [chunk.strip("\n") for chunk in chunks]
+    return [f"{header}\n\n// ...\n\n{chunk}" if header else chunk for chunk in chunks]
+
+
+def pack_by_tokens(sizes, budget, max_items):
+    """
+    First-fit decreasing bin packing: group item indexes so that each group
+    totals at most `budget` and holds at most `max_items`. Groups keep the
+    original item order.
+    """
+    bins = []
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        for group in bins:
+            if group["size"] + sizes[i] <= budget and len(group["items"]) < max_items:
+                group["items"].append(i)
+                group["size"] += sizes[i]
+                break
+        else:
+            bins.append({"items": [i], "size": sizes[i]})
+    return sorted((sorted(group["items"]) for group in bins), key=lambda items: items[0])
+
+
+def normalize_evidence(evidence):
+    return " ".join(evidence.split())
+
+
+def merge_messages(messages):
+    """
+    Merge the per-chunk answers for one file, dropping services reported
+    more than once with the same evidence (e.g. from the shared import header).
+    When every chunk reports a confidence (cascade tiers), the file gets the
+    lowest one.
+    """
+    seen = set()
+    merged = []
+    for message in messages:
+        for service_data in message.get("detected_data_sink_services", []):
+            key = (service_data.get("service"), normalize_evidence(service_data.get("evidence", "")))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(service_data)
+    result = {"detected_data_sink_services": merged}
+    confidences = [message.get("confidence") for message in messages]
+    if confidences and all(isinstance(confidence, (int, float)) for confidence in confidences):
+        result["confidence"] = min(confidences)
+    return result
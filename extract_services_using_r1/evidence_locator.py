@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+import argparse
+import bisect
+import json
+import os
+import re
+from collections import deque
+
+from sources import open_source
+
+WORD = re.compile(r'[\w$]')
+# LLMs shorten long evidence with an ellipsis; the pieces are matched in order
+ELLIPSIS = re.compile(r'\s*(?:\.\.\.|…)\s*')
+# Pieces shorter than this ("(", ");") match almost anywhere and are ignored,
+# unless the evidence has no longer piece
+MIN_PIECE = 4
+
+
+def normalize(text):
+    """
+    `text` without whitespace, except for one space where it separates two
+    words, and for each character of the result its offset in `text`. So
+    `save(\n  entity,\n)` and `save(entity,)` normalize the same.
+    """
+    chars = []
+    offsets = []
+    for match in re.finditer(r'\S+|\s+', text):
+        if not match.group(0)[0].isspace():
+            chars.extend(match.group(0))
+            offsets.extend(range(match.start(), match.end()))
+        elif chars and WORD.match(chars[-1]) and WORD.match(text, match.end()):
+            chars.append(' ')
+            offsets.append(match.start())
+    return ''.join(chars), offsets
+
+
+def evidence_pieces(evidence):
+    pieces = [piece for piece in (normalize(piece)[0] for piece in ELLIPSIS.split(evidence or '')) if piece]
+    return [piece for piece in pieces if len(piece) >= MIN_PIECE] or pieces
+
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher: one pass over a text finds every
+    occurrence of every pattern, in time linear in the text plus the
+    number of matches. Built once per file over all of its snippets.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.lengths = [len(pattern) for pattern in patterns]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(pattern_id)
+        # Breadth first, so a state's failure link is final before its children's
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find_all(self, text):
+        """
+        Yields (start, pattern id) for every occurrence, in order of end offset.
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                yield i - self.lengths[pattern_id] + 1, pattern_id
+
+
+def locate(file_content, evidences):
+    """
+    Spans of each evidence string in the file, as 1-based (start_line,
+    end_line), or None when it does not occur. Whitespace differences are
+    ignored (see normalize), and an evidence shortened with "..." matches when its pieces
+    occur in order.
+    """
+    pieces = [evidence_pieces(evidence) for evidence in evidences]
+    patterns = sorted({piece for evidence in pieces for piece in evidence})
+    if not patterns:
+        return [None] * len(evidences)
+    text, offsets = normalize(file_content)
+    positions = {pattern: [] for pattern in patterns}
+    for start, pattern_id in AhoCorasick(patterns).find_all(text):
+        positions[patterns[pattern_id]].append(start)
+    line_starts = [0] + [match.end() for match in re.finditer('\n', file_content)]
+
+    def line(offset):
+        return bisect.bisect_right(line_starts, offset)
+
+    spans = []
+    for evidence in pieces:
+        span = None
+        for first in positions[evidence[0]] if evidence else []:
+            end = first + len(evidence[0])
+            for piece in evidence[1:]:
+                found = positions[piece]
+                k = bisect.bisect_left(found, end)
+                if k == len(found):
+                    end = None
+                    break
+                end = found[k] + len(piece)
+            if end is not None:
+                span = (line(offsets[first]), line(offsets[end - 1]))
+                break
+        spans.append(span)
+    return spans
+
+
+def locate_record(record, file_content):
+    """
+    Add start_line/end_line and evidence_found to the detected services of
+    a record, in place; evidence_found is None for an empty evidence, which
+    cannot be looked up. Returns (number of services looked up, names of
+    the services whose evidence is not in the file).
+    """
+    message = record.get('message')
+    services = message.get('detected_data_sink_services') if isinstance(message, dict) else None
+    services = [service for service in services or [] if isinstance(service, dict)]
+    spans = locate(file_content, [service.get('evidence') or '' for service in services])
+    missing = []
+    searched = 0
+    for service, span in zip(services, spans):
+        if not evidence_pieces(service.get('evidence')):
+            service['evidence_found'] = None
+            continue
+        searched += 1
+        service['evidence_found'] = span is not None
+        if span:
+            service['start_line'], service['end_line'] = span
+        else:
+            missing.append(service.get('service'))
+    return searched, missing
+
+
+def github_anchor(start_line, end_line):
+    return f"#L{start_line}" if start_line == end_line else f"#L{start_line}-L{end_line}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the evidence of every detected service in its source file")
+    parser.add_argument("results", nargs='?', default="service_extraction.json", help="annotated in place")
+    parser.add_argument("--source", default=os.getenv("SOURCE_ROOT", "/home/suchitg/DataCare"),
+                        help="directory, REPO@REVISION or archive, as for ext_service.py")
+    parser.add_argument("--source-prefix", default="twenty/")
+    args = parser.parse_args()
+
+    with open(args.results, 'r') as f:
+        records = json.load(f)
+    source = open_source(args.source, args.source_prefix)
+    total = 0
+    missing = []
+    for record, (_, file_content) in zip(records, source.read_many([record['filename'] for record in records])):
+        if file_content is None:
+            print(f"Source not found: {record['filename']}")
+            continue
+        services, not_found = locate_record(record, file_content)
+        total += services
+        missing.extend((record['filename'], service) for service in not_found)
+    source.close()
+    with open(args.results, 'w') as f:
+        json.dump(records, f, indent=4)
+    print(f"Located {total - len(missing)} of {total} evidence snippets")
+    for filename, service in missing:
+        print(f"Evidence not found in the file: {service} in {filename}")
+
+
+if __name__ == "__main__":
+    main()
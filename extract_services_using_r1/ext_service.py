@@ -1,10 +1,32 @@
 import os
 import json
+import hashlib
+import argparse
+import asyncio
+import httpx
 import openai
 import requests
 import time
+import copy
 from dotenv import load_dotenv
 from multiprocessing import Process, Queue
+from queue import Empty
+from cascade import Cascade, confidence_prompt, make_tiers
+from checkpoint import CheckpointWriter, compact_checkpoint
+from chunking import chunk_source, estimate_tokens, merge_messages, pack_by_tokens
+from evidence_locator import locate_record
+from import_graph import ImportGraph, ReachabilityIndex, sink_importers
+from job_queue import JobQueue
+from metrics import RunMetrics
+from near_duplicates import find_duplicates
+from prefilter import load_dependencies, load_sink_libraries, prefilter, select_sink_libraries
+from response_cache import ResponseCache
+from results_store import ResultsStore
+from scheduler import RequestFailed, RequestScheduler
+from sink_rules import covered as covered_by_rules, extract as extract_sinks
+from sources import DirectorySource, open_source
+from streaming import CompletionStream
+from symbol_index import SymbolIndex, annotate_results
 
 load_dotenv()
 
@@ -15,6 +37,8 @@ client = openai.OpenAI(
     base_url=OPENAI_API_BASE
 )
 
+# Static preamble, sent byte-identical as the first message of every request so
+# that servers with prefix caching only process it once
 instructions = """\
 Instructions:
 - In the given code file, identify all services acting as data sinks. A data sink is defined as any service/component that receives and stores/transmits data from the application. Focus on extracting the **service name** as used in the code, not the underlying sink's or product's name (e.g., instead of "database", look for the specific service/component name like "userDBService").
@@ -27,21 +51,21 @@ Note: Focus on extracting the service name as it appears in the code (e.g., "log
 
 JSON Output Format:
 
-{{
+{
     "detected_data_sink_services": [
-        {{
+        {
             "service": "[short and relevant service/component name]",
             "evidence": "[the exact code snippet showing the sink operation]",
             "reasoning": "[explanation of why this is a data sink]"
-        }},
-        {{
+        },
+        {
             "service": "[short and relevant service/component name]",
             "evidence": "[the exact code snippet showing the sink operation]",
             "reasoning": "[explanation of why this is a data sink]"
-        }},
+        },
         ...
     ]
-}}
+}
 
 ---
 
@@ -54,67 +78,69 @@ export const seedUserWorkspaces = async (
   workspaceDataSource: DataSource,
   schemaName: string,
   workspaceId: string,
-) => {{
+) => {
   await workspaceDataSource
     .createQueryBuilder()
     .insert()
-    .into(`${{schemaName}}.${{tableName}}`, ['id', 'userId', 'workspaceId'])
+    .into(`${schemaName}.${tableName}`, ['id', 'userId', 'workspaceId'])
     .orIgnore()
     .values([
-      {{
+      {
         id: DEV_SEED_USER_WORKSPACE_IDS.NOAH,
         userId: DEMO_SEED_USER_IDS.NOAH,
         workspaceId: workspaceId,
-      }},
-      {{
+      },
+      {
         id: DEV_SEED_USER_WORKSPACE_IDS.HUGO,
         userId: DEMO_SEED_USER_IDS.HUGO,
         workspaceId: workspaceId,
-      }},
-      {{
+      },
+      {
         id: DEV_SEED_USER_WORKSPACE_IDS.TIM,
         userId: DEMO_SEED_USER_IDS.TIM,
         workspaceId: workspaceId,
-      }},
+      },
     ])
     .execute();
-}};
+};
 
 export const deleteUserWorkspaces = async (
   workspaceDataSource: DataSource,
   schemaName: string,
   workspaceId: string,
-) => {{
+) => {
   await workspaceDataSource
     .createQueryBuilder()
     .delete()
-    .from(`${{schemaName}}.${{tableName}}`)
-    .where(`"${{tableName}}"."workspaceId" = :workspaceId`, {{
+    .from(`${schemaName}.${tableName}`)
+    .where(`"${tableName}"."workspaceId" = :workspaceId`, {
       workspaceId,
-    }})
+    })
     .execute();
-}};
+};
 ```
 
 The output should be:
 
-{{
+{
     "detected_data_sink_services": [
-        {{
+        {
             "service": "workspaceDataSource",
-            "evidence": "await workspaceDataSource\n    .createQueryBuilder()\n    .insert()\n    .into(`${{schemaName}}.${{tableName}}`, ['id', 'userId', 'workspaceId'])\n    .orIgnore()\n    .values([\n      {{\n        id: DEV_SEED_USER_WORKSPACE_IDS.NOAH,\n        userId: DEMO_SEED_USER_IDS.NOAH,\n        workspaceId: workspaceId,\n      }},\n      {{\n        id: DEV_SEED_USER_WORKSPACE_IDS.HUGO,\n        userId: DEMO_SEED_USER_IDS.HUGO,\n        workspaceId: workspaceId,\n      }},\n      {{\n        id: DEV_SEED_USER_WORKSPACE_IDS.TIM,\n        userId: DEMO_SEED_USER_IDS.TIM,\n        workspaceId: workspaceId,\n      }},\n    ])\n    .execute();",
+            "evidence": "await workspaceDataSource\n    .createQueryBuilder()\n    .insert()\n    .into(`${schemaName}.${tableName}`, ['id', 'userId', 'workspaceId'])\n    .orIgnore()\n    .values([\n      {\n        id: DEV_SEED_USER_WORKSPACE_IDS.NOAH,\n        userId: DEMO_SEED_USER_IDS.NOAH,\n        workspaceId: workspaceId,\n      },\n      {\n        id: DEV_SEED_USER_WORKSPACE_IDS.HUGO,\n        userId: DEMO_SEED_USER_IDS.HUGO,\n        workspaceId: workspaceId,\n      },\n      {\n        id: DEV_SEED_USER_WORKSPACE_IDS.TIM,\n        userId: DEMO_SEED_USER_IDS.TIM,\n        workspaceId: workspaceId,\n      },\n    ])\n    .execute();",
             "reasoning": "The service 'workspaceDataSource' is used to insert data into a table, indicating it is acting as a data sink."
-        }},
-        {{
+        },
+        {
             "service": "workspaceDataSource",
-            "evidence": "await workspaceDataSource\n    .createQueryBuilder()\n    .delete()\n    .from(`${{schemaName}}.${{tableName}}`)\n    .where(`\"${{tableName}}\".\"workspaceId\" = :workspaceId`, {{\n      workspaceId,\n    }})\n    .execute();",
+            "evidence": "await workspaceDataSource\n    .createQueryBuilder()\n    .delete()\n    .from(`${schemaName}.${tableName}`)\n    .where(`\"${tableName}\".\"workspaceId\" = :workspaceId`, {\n      workspaceId,\n    })\n    .execute();",
             "reasoning": "The service 'workspaceDataSource' is used to delete data from a table, indicating it is acting as a data sink."
-        }}
+        }
     ]
-}}
+}
 
 ---
+"""
 
+file_prompt = """\
 File path:
 {file_path}
 
@@ -126,9 +152,42 @@ File content:
 ```
 """
 
+# Appended to a file's prompt when the local rules (sink_rules.py) found
+# candidates but could not account for every call in the file
+hint_prompt = """
+Candidate data sinks found by static rules in this file. Include the ones that are real data sinks in your answer, and add any the rules missed:
+{candidates}
+"""
 
-def get_completions(context_to_send, queue):
-    url = "https://api.fireworks.ai/inference/v1/chat/completions"
+# User message for several small files sent together; the answer is keyed by
+# file path and split back into one record per file
+packed_prompt = """This request contains {count} files. Apply the instructions to each file separately. Instead of the single-file output format, answer with one JSON object that has an entry for every file, keyed by its exact file path:
+
+{{
+    "files": {{
+        "[file path]": {{
+            "detected_data_sink_services": [...]
+        }},
+        ...
+    }}
+}}
+
+{files}"""
+
+
+# Both can be overridden, e.g. to run against mock_server.py
+API_URL = os.getenv("EXTRACTION_API_URL", "https://api.fireworks.ai/inference/v1/chat/completions")
+SOURCE_ROOT = os.getenv("SOURCE_ROOT", "/home/suchitg/DataCare")
+REPO_ROOT = f"{SOURCE_ROOT}/twenty"
+# The twenty monorepo declares different dependencies at the root and in twenty-server
+PACKAGE_JSONS = [
+    f"{SOURCE_ROOT}/twenty/package.json",
+    f"{SOURCE_ROOT}/twenty/packages/twenty-server/package.json",
+]
+
+
+def build_payload(context_to_send, stream=False, tier=None):
+    # `tier` is a cascade tier (see cascade.make_tiers) overriding the model
     payload = {
         "model": "accounts/fireworks/models/deepseek-r1",
         "max_tokens": 32768,
@@ -141,72 +200,926 @@ def get_completions(context_to_send, queue):
             "type": "json_object"
         },
         "messages": [
+            {
+                "role": "system",
+                "content": instructions
+            },
             {
                 "role": "user",
                 "content": context_to_send
             }
         ]
     }
-    headers = {
+    if tier:
+        payload["model"] = tier["model"]
+        payload["max_tokens"] = tier["max_tokens"]
+        if tier.get("confidence"):
+            payload["messages"][1]["content"] += confidence_prompt
+    if stream:
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+
+def build_headers():
+    return {
         "Accept": "application/json",
         "Content-Type": "application/json",
         "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"
     }
-    response = requests.post(url, json=payload, headers=headers)
-    result = response.json()['choices'][0]['message']['content']
-    queue.put(result)
 
 
-def main():
-    responses = []
-    file_info = json.load(open('sink_files.json', 'r'))
-    batch_sz = 10
-    
+def completion_content(result):
+    """
+    Answer text of a decoded completion; ValueError for any other shape
+    (e.g. a 200 with "choices": null), so the file is recorded as failed.
+    """
+    try:
+        content = result['choices'][0]['message']['content']
+    except (TypeError, KeyError, IndexError) as e:
+        raise ValueError(f"unexpected completion shape ({type(e).__name__}: {e})") from None
+    if not isinstance(content, str):
+        raise ValueError("completion has no text content")
+    return content
+
+
+def usage_stats(result):
+    """
+    Token counts of a completion. Reasoning tokens are estimated from the
+    <think> block when the API does not report them.
+    """
+    content = completion_content(result)
+    usage = result.get('usage') if isinstance(result.get('usage'), dict) else {}
+    reasoning_tokens = (usage.get('completion_tokens_details') or {}).get('reasoning_tokens')
+    if reasoning_tokens is None:
+        reasoning_tokens = estimate_tokens(content.split("</think>")[0]) if "</think>" in content else 0
+    return {
+        "prompt_tokens": usage.get('prompt_tokens', 0),
+        "completion_tokens": usage.get('completion_tokens', 0),
+        "reasoning_tokens": reasoning_tokens,
+    }
+
+
+def get_completions(context_to_send, queue, timeout=600, api_url=API_URL):
+    # Always put something on the queue, otherwise the parent blocks forever
+    stats = {"started": time.time()}
+    try:
+        response = requests.post(api_url, json=build_payload(context_to_send), headers=build_headers(),
+                                 timeout=timeout, stream=True)
+        stats["first_byte"] = time.time()
+        stats["request_bytes"] = len(response.request.body or b"")
+        stats["response_bytes"] = len(response.content)
+        response.raise_for_status()
+        result = response.json()
+        stats.update(usage_stats(result))
+        result = completion_content(result)
+    except Exception as e:
+        print(f"Request failed: {e}")
+        result = None
+    stats["ended"] = time.time()
+    queue.put((result, stats))
+
+
+async def get_completions_async(scheduler, context_to_send, prefix_stats=None, request_stats=None, stream=None,
+                                api_url=API_URL, tier=None):
+    # `stream` is a CompletionStream to consume the response as server-sent events
+    result = await scheduler.post(api_url, build_payload(context_to_send, stream=stream is not None, tier=tier),
+                                  estimated_tokens=estimate_tokens(instructions) + estimate_tokens(context_to_send),
+                                  timing=request_stats, read=stream.read if stream else None)
+    content = completion_content(result)
+    if request_stats is not None:
+        request_stats.update(usage_stats(result))
+    if prefix_stats is not None:
+        usage = result.get('usage') if isinstance(result.get('usage'), dict) else {}
+        prefix_stats['requests'] += 1
+        prefix_stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+        prefix_stats['cached_tokens'] += (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+    return content
+
+
+def report_prefix_stats(prefix_stats):
+    prefix_tokens = estimate_tokens(instructions)
+    print(f"Prompt prefix: ~{prefix_tokens} tokens shared by {prefix_stats['requests']} requests "
+          f"(~{prefix_tokens * prefix_stats['requests']} tokens)")
+    if prefix_stats['cached_tokens']:
+        print(f"Server reported {prefix_stats['cached_tokens']} of {prefix_stats['prompt_tokens']} prompt tokens served from its prefix cache")
+
+
+def content_hash(file_content):
+    return hashlib.sha256(file_content.encode("utf-8")).hexdigest()
+
+
+def split_response(response):
+    # Non-reasoning models (the fast cascade tiers) answer without a <think> block
+    reasoning, message = response.split("</think>", 1) if "</think>" in response else ("", response)
+    message = json.loads(message.strip())
+    if not isinstance(message, dict):
+        raise ValueError(f"answer is a JSON {type(message).__name__}, not an object")
+    return reasoning.replace("<think>", "").strip(), message
+
+
+def make_record(file_name, file_content, message, reasoning):
+    return {
+        "filename": file_name['filename'],
+        "content_hash": content_hash(file_content),
+        "message": message,
+        "reasoning": reasoning
+    }
+
+
+def parse_response(file_name, response, file_content):
+    reasoning, message = split_response(response)
+    return make_record(file_name, file_content, message, reasoning)
+
+
+def format_hints(candidates, file_content):
+    # Only the candidates whose evidence is in this (chunk of the) file
+    lines = [f"- {c['service']} (line {c['start_line']}): {c['evidence'].splitlines()[0].strip()}"
+             for c in candidates or [] if c['evidence'].splitlines()[0].strip() in file_content]
+    return hint_prompt.format(candidates="\n".join(lines)) if lines else ""
+
+
+def build_packed_prompt(files, hints=None):
+    hints = hints or {}
+    return packed_prompt.format(
+        count=len(files),
+        files="\n---\n\n".join(
+            file_prompt.format(file_path=file_name['filename'], file_content=file_content)
+            + format_hints(hints.get(file_name['filename']), file_content)
+            for file_name, file_content in files)
+    )
+
+
+def split_packed_response(files, response):
+    """
+    Split a packed answer into per-file records. Returns the records and the
+    files whose entry is missing or malformed; raises ValueError when the
+    answer as a whole is unusable.
+    """
+    reasoning, message = split_response(response)
+    answers = message.get("files") if isinstance(message, dict) else None
+    if not isinstance(answers, dict):
+        raise ValueError('packed answer has no "files" object')
+    answers = {path.strip().lstrip("./"): answer for path, answer in answers.items()}
+    # A cascade tier may still report one confidence for the whole pack
+    confidence = message.get("confidence")
+    reasoning = f"[packed with {', '.join(file_name['filename'] for file_name, _ in files)}]\n{reasoning}"
+    records = []
+    missing = []
+    for file_name, file_content in files:
+        answer = answers.get(file_name['filename'].lstrip("./"))
+        if isinstance(answer, dict) and isinstance(answer.get("detected_data_sink_services"), list):
+            if confidence is not None and "confidence" not in answer:
+                answer["confidence"] = confidence
+            records.append(make_record(file_name, file_content, answer, reasoning))
+        else:
+            missing.append((file_name, file_content))
+    return records, missing
+
+
+def plan_packs(jobs, budget, max_files):
+    """
+    Bin-pack files of at most half of `budget` (estimated tokens) into
+    groups of up to `max_files` files and `budget` tokens. Returns the packs
+    and the files that are sent on their own.
+    """
+    small = [job for job in jobs if estimate_tokens(job[1]) <= budget // 2]
+    singles = [job for job in jobs if estimate_tokens(job[1]) > budget // 2]
+    packs = []
+    for group in pack_by_tokens([estimate_tokens(file_content) for _, file_content in small], budget, max_files):
+        if len(group) == 1:
+            singles.append(small[group[0]])
+        else:
+            packs.append([small[i] for i in group])
+    return packs, singles
+
+
+def build_prompts(file_name, file_content, max_chunk_tokens=None, hints=None):
+    """
+    One prompt for the whole file, or one per chunk when the file is larger
+    than `max_chunk_tokens`, followed by the local rule candidates in `hints`.
+    """
+    chunks = chunk_source(file_content, max_chunk_tokens) if max_chunk_tokens else [file_content]
+    if len(chunks) == 1:
+        return [file_prompt.format(file_path=file_name['filename'], file_content=file_content)
+                + format_hints(hints, file_content)]
+    return [
+        file_prompt.format(file_path=f"{file_name['filename']} (part {i+1} of {len(chunks)})", file_content=chunk)
+        + format_hints(hints, chunk)
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def apply_local_rules(jobs, on_result):
+    """
+    Run the sink_rules extractor over each file. A file the rules fully
+    explain (sink_rules.covered) gets its record right away; the
+    candidates of the others are returned as prompt hints.
+    """
+    remaining = []
+    hints = {}
+    covered = 0
+    for file_name, file_content in jobs:
+        candidates, suspects = extract_sinks(file_content)
+        if covered_by_rules(candidates, suspects):
+            rules = sorted({candidate['rule'] for candidate in candidates})
+            record = make_record(file_name, file_content, {"detected_data_sink_services": candidates},
+                                 f"Extracted by local rules: {', '.join(rules)}")
+            record["extracted_by"] = "rules"
+            on_result(record)
+            covered += 1
+            continue
+        if candidates:
+            hints[file_name['filename']] = candidates
+        remaining.append((file_name, file_content))
+    print(f"Local rules: {covered} files fully covered, {len(hints)} sent with hints, "
+          f"{len(remaining) - len(hints)} sent without")
+    return remaining, hints
+
+
+def duplicate_record(record, file_name, file_content, similarity):
+    message = copy.deepcopy(record['message'])
+    services = message.get('detected_data_sink_services') if isinstance(message, dict) else None
+    for service in services or []:
+        # Line numbers are the representative's; --locate-evidence finds them again
+        for key in ('start_line', 'end_line', 'evidence_found'):
+            if isinstance(service, dict):
+                service.pop(key, None)
+    duplicate = make_record(file_name, file_content, message,
+                            f"Near duplicate of {record['filename']} (similarity {similarity:.2f}) whose differing "
+                            f"lines touch no sink calls; its result is reused.")
+    duplicate["duplicate_of"] = record['filename']
+    return duplicate
+
+
+def apply_near_duplicates(jobs, threshold, on_result):
+    """
+    Send one file per cluster of near duplicates (see near_duplicates.py).
+    Returns the remaining jobs, the duplicates and an on_result that also
+    records the duplicates of each representative as it finishes.
+    """
+    remaining, duplicates, reverified = find_duplicates(jobs, threshold)
+    print(f"Near duplicates: {sum(len(members) for members in duplicates.values())} files reuse the result of one of "
+          f"{len(duplicates)} representatives, {len(reverified)} differ in sink code and are sent")
+
+    def write(record):
+        on_result(record)
+        for file_name, file_content, similarity in duplicates.get(record['filename'], []):
+            on_result(duplicate_record(record, file_name, file_content, similarity))
+
+    return remaining, duplicates, write
+
+
+def merge_chunk_responses(file_name, file_content, responses):
+    if len(responses) == 1:
+        return parse_response(file_name, responses[0], file_content)
+    parts = [split_response(response) for response in responses]
+    reasoning = "\n\n".join(f"[part {i+1} of {len(parts)}]\n{part_reasoning}" for i, (part_reasoning, _) in enumerate(parts))
+    return make_record(file_name, file_content, merge_messages([message for _, message in parts]), reasoning)
+
+
+def load_sources(source, file_info, files_not_found):
+    # `source` is a provider from sources.py; it reads ahead in bulk
+    jobs = []
+    contents = source.read_many([file_name['filename'] for file_name in file_info])
+    for file_name, (_, file_content) in zip(file_info, contents):
+        if file_content is None:
+            files_not_found.append(file_name['filename'])
+        else:
+            jobs.append((file_name, file_content))
+    return jobs
+
+
+def plan_incremental(jobs, previous_path):
+    """
+    Split jobs into those whose previous result can be reused (same content
+    hash as in the last run) and those that have to be sent again. Files that
+    are no longer listed, or no longer exist, simply drop out of the output.
+    """
+    try:
+        previous = {item['filename']: item for item in json.load(open(previous_path, 'r'))}
+    except FileNotFoundError:
+        previous = {}
+    reused = {}
+    changed = []
+    for file_name, file_content in jobs:
+        item = previous.get(file_name['filename'])
+        if item is not None and item.get('content_hash') == content_hash(file_content):
+            reused[file_name['filename']] = item
+        else:
+            changed.append((file_name, file_content))
+    dropped = len(set(previous) - {file_name['filename'] for file_name, _ in jobs})
+    print(f"Incremental: reusing {len(reused)}, re-extracting {len(changed)}, dropping {dropped}")
+    return reused, changed
+
+
+def wait_for_result(process, queue, started, poll=1.0):
+    # The child posts (response, stats); if it dies without posting, the file fails
+    while True:
+        try:
+            return queue.get(timeout=poll)
+        except Empty:
+            if not process.is_alive():
+                break
+    try:
+        return queue.get(timeout=poll)
+    except Empty:
+        print(f"Request process exited with code {process.exitcode} without a result")
+        return None, {"started": started, "ended": time.time()}
+
+
+def run_processes(jobs, batch_sz, on_result, failed, cache=None, timeout=600, metrics=None, api_url=API_URL, hints=None):
     i = 0
-    file_not_found_count = 0
-    files_not_found = []
-    for batch_idx in range(0, len(file_info), batch_sz):
+    for batch_idx in range(0, len(jobs), batch_sz):
         print(f"Processing batch {i+1}")
-        batch = file_info[batch_idx:batch_idx+batch_sz]
+        batch = jobs[batch_idx:batch_idx+batch_sz]
         processes = []
         queues = []
         start_time = time.time()
         # Start processes for the batch
-        for file_name in batch:
-            try:
-                with open(f"/home/suchitg/DataCare/{file_name['filename']}", 'r') as f:
-                    file_content = f.read()
-            except FileNotFoundError:
-                file_not_found_count += 1
-                files_not_found.append(file_name['filename'])
+        for file_name, file_content in batch:
+            prompt = build_prompts(file_name, file_content, hints=(hints or {}).get(file_name['filename']))[0]
+            cached = cache.get(build_payload(prompt)) if cache else None
+            if cached is not None:
+                if metrics:
+                    now = time.time()
+                    metrics.request(filename=file_name['filename'], part=0, enqueued=start_time, started=now, ended=now,
+                                    cached=True, status="ok")
+                parse_start = time.perf_counter()
+                on_result(parse_response(file_name, cached, file_content))
+                if metrics:
+                    metrics.file(filename=file_name['filename'], status="ok", parse_seconds=time.perf_counter() - parse_start)
                 continue
 
             queue = Queue()
-            process = Process(target=get_completions, args=(instructions.format(file_path=file_name['filename'], file_content=file_content), queue))
+            process = Process(target=get_completions, args=(prompt, queue, timeout, api_url))
             process.start()
             processes.append(process)
-            queues.append((file_name, queue))
+            queues.append((file_name, file_content, prompt, queue))
         
         # Collect results from this batch
-        for process, (file_name, queue) in zip(processes, queues):
-            response = queue.get()  # blocks until result is available
-            reasoning, message = response.split("</think>")
-            responses.append({
-                "filename": file_name['filename'],
-                "message": json.loads(message.strip()),
-                "reasoning": reasoning.replace("<think>", "").strip()
-            })
-            process.join() 
+        for process, (file_name, file_content, prompt, queue) in zip(processes, queues):
+            response, stats = wait_for_result(process, queue, start_time)
+            process.join()
+            if metrics:
+                metrics.request(filename=file_name['filename'], part=0, enqueued=start_time, cached=False, retries=0,
+                                attempts=1, status="ok" if response is not None else "failed", **stats)
+            if response is None:
+                failed.append(file_name['filename'])
+                if metrics:
+                    metrics.file(filename=file_name['filename'], status="failed", parse_seconds=0.0)
+                continue
+            parse_start = time.perf_counter()
+            try:
+                on_result(parse_response(file_name, response, file_content))
+            except ValueError as e:
+                print(f"Could not parse response for {file_name['filename']}: {e}")
+                failed.append(file_name['filename'])
+                if metrics:
+                    metrics.file(filename=file_name['filename'], status="failed", parse_seconds=time.perf_counter() - parse_start)
+                continue
+            if metrics:
+                metrics.file(filename=file_name['filename'], status="ok", parse_seconds=time.perf_counter() - parse_start)
+            if cache:
+                cache.put(build_payload(prompt), response)
         
         end_time = time.time()
         print(f"Batch {i+1} processed in {end_time - start_time:.2f} seconds")
         print("-"*20)
         i += 1
-            
-    json.dump(responses, open('service_extraction.json', 'w'), indent=4)
-    print("Saved service extraction results to service_extraction.json")
-    print(f"{file_not_found_count} files not found")
+
+
+async def run_async(jobs, concurrency, on_result, failed, cache=None, max_chunk_tokens=None, scheduler_options=None,
+                    metrics=None, stream_options=None, api_url=API_URL, refill=None, on_failure=None, pack_options=None,
+                    hints=None, cascade=None):
+    """
+    Keep `concurrency` requests in flight over one pooled HTTP client. Each
+    worker picks up the next request as soon as its previous call returns, so
+    a slow file only holds up its own slot instead of a whole batch. Chunks of
+    a large file are queued as separate requests and merged once all are back.
+    With `stream_options` ({"reasoning_dir", "max_reasoning_tokens"}) the
+    completions are streamed, see streaming.CompletionStream. With
+    `pack_options` ({"budget", "max_files"}) small files are sent several to
+    a request; files missing from a packed answer are retried on their own.
+    `hints` maps file names to local rule candidates to add to the prompts.
+    With a `cascade` (see cascade.py) every file starts at the fast tier and
+    is sent again to the next tier when its answer trips a trigger; only the
+    reasoning tier is streamed.
+
+    `refill`, when given, is an async function returning more jobs once the
+    queue runs dry (an empty list ends the run), and `on_failure` is called
+    with the file and error of every failed file.
+    """
+    pending = asyncio.Queue()
+    refill_lock = asyncio.Lock()
+    # Packs in flight can still put fallback requests on the queue
+    packs_in_flight = 0
+    queue_changed = asyncio.Condition()
+    total = 0
+
+    tiers = cascade.tiers if cascade else [None]
+
+    def enqueue(file_name, file_content, tier=None, history=None):
+        nonlocal total
+        prompts = build_prompts(file_name, file_content, max_chunk_tokens, (hints or {}).get(file_name['filename']))
+        parts = {"responses": [None] * len(prompts), "remaining": len(prompts), "error": None, "enqueued": time.time(),
+                 "tier": (cascade.first_tier(file_content) if cascade else 0) if tier is None else tier,
+                 "history": history or [], "seconds": 0.0}
+        for index, prompt in enumerate(prompts):
+            pending.put_nowait((file_name, file_content, index, prompt, parts))
+        total += 1
+
+    def enqueue_pack(files):
+        nonlocal total
+        parts = {"responses": [None], "remaining": 1, "error": None, "enqueued": time.time(), "pack": files,
+                 "tier": 0, "history": [], "seconds": 0.0}
+        pending.put_nowait((files[0][0], None, 0, build_packed_prompt(files, hints), parts))
+        total += len(files)
+
+    async def next_request():
+        nonlocal packs_in_flight
+        while True:
+            if pending.empty() and refill:
+                async with refill_lock:
+                    if pending.empty():
+                        for file_name, file_content in await refill():
+                            enqueue(file_name, file_content)
+            try:
+                request = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                if not packs_in_flight:
+                    return None
+                async with queue_changed:
+                    await queue_changed.wait_for(lambda: not pending.empty() or not packs_in_flight)
+                continue
+            if "pack" in request[4]:
+                packs_in_flight += 1
+            return request
+
+    def escalate(file_name, file_content, parts, record):
+        # Send the file to the next tier if the answer trips a trigger
+        nonlocal total
+        if not cascade:
+            return False
+        reason = cascade.check(parts["tier"], record, file_content)
+        if reason is None:
+            return False
+        seconds = parts["seconds"] / len(parts.get("pack", [None]))
+        cascade.escalated(parts["tier"], reason, seconds)
+        history = parts["history"] + [{"tier": tiers[parts["tier"]]["name"], "reason": reason, "seconds": seconds}]
+        print(f"Escalating {file_name['filename']} to {tiers[parts['tier'] + 1]['name']} ({reason})")
+        total -= 1
+        enqueue(file_name, file_content, parts["tier"] + 1, history)
+        return True
+
+    def finish(record, parts):
+        if cascade:
+            seconds = parts["seconds"] / len(parts.get("pack", [None]))
+            cascade.finished(parts["tier"], seconds)
+            record["cascade"] = {"tier": tiers[parts["tier"]]["name"], "seconds": seconds, "escalations": parts["history"]}
+        on_result(record)
+
+    async def finish_pack(files, response, error, parts):
+        nonlocal completed, total, packs_in_flight
+        records = []
+        fallback = files
+        parse_start = time.perf_counter()
+        try:
+            if error:
+                raise error
+            records, fallback = split_packed_response(files, response)
+        except (RequestFailed, KeyError, IndexError, ValueError) as e:
+            print(f"Packed request for {len(files)} files failed: {e}")
+        parse_seconds = (time.perf_counter() - parse_start) / len(files)
+        contents = {file_name['filename']: (file_name, file_content) for file_name, file_content in files}
+        for record in records:
+            if escalate(*contents[record['filename']], parts, record):
+                continue
+            finish(record, parts)
+            if metrics:
+                metrics.file(filename=record['filename'], status="ok", parse_seconds=parse_seconds, packed=len(files),
+                             **({"tier": tiers[parts["tier"]]["name"]} if cascade else {}))
+            completed += 1
+            print(f"[{completed}/{total}] {record['filename']} (packed, {time.time() - start_time:.2f}s)")
+        for file_name, file_content in fallback:
+            print(f"Retrying {file_name['filename']} on its own")
+            total -= 1
+            enqueue(file_name, file_content)
+        packs_in_flight -= 1
+        async with queue_changed:
+            queue_changed.notify_all()
+
+    if pack_options:
+        packs, jobs = plan_packs(jobs, pack_options["budget"], pack_options["max_files"])
+        print(f"Packing {sum(len(files) for files in packs)} small files into {len(packs)} requests")
+        for files in packs:
+            enqueue_pack(files)
+    for file_name, file_content in jobs:
+        enqueue(file_name, file_content)
+    completed = 0
+    prefix_stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+    start_time = time.time()
+
+    async def worker(scheduler):
+        nonlocal completed
+        while True:
+            request = await next_request()
+            if request is None:
+                return
+            file_name, file_content, index, prompt, parts = request
+            stats = {"filename": file_name['filename'], "part": index, "enqueued": parts["enqueued"], "started": time.time()}
+            if "pack" in parts:
+                stats["packed"] = len(parts["pack"])
+            tier = tiers[parts["tier"]]
+            if tier:
+                stats["tier"] = tier["name"]
+            response = cache.get(build_payload(prompt, tier=tier)) if cache else None
+            stats["cached"] = response is not None
+            stats["status"] = "ok"
+            if response is None:
+                stream = None
+                if stream_options and (tier is None or tier.get("reasoning")):
+                    trace_name = f"{file_name['filename'].replace('/', '__')}.{index}.txt"
+                    stream = CompletionStream(os.path.join(stream_options["reasoning_dir"], trace_name),
+                                              stream_options.get("max_reasoning_tokens"))
+                try:
+                    response = await get_completions_async(scheduler, prompt, prefix_stats, stats, stream, api_url, tier)
+                    split_response(response)  # only cache well-formed answers
+                except (RequestFailed, KeyError, IndexError, ValueError) as e:
+                    parts["error"] = e
+                    stats["status"] = "failed"
+                else:
+                    if cache:
+                        cache.put(build_payload(prompt, tier=tier), response)
+                stats["retries"] = stats.get("attempts", 1) - 1
+                if stream:
+                    stats["first_token"] = stream.first_token
+                    stats["reasoning_end"] = stream.reasoning_end
+            stats["ended"] = time.time()
+            parts["seconds"] += stats["ended"] - stats["started"]
+            if metrics:
+                metrics.request(**stats)
+            parts["responses"][index] = response
+            parts["remaining"] -= 1
+            if parts["remaining"]:
+                continue
+            if "pack" in parts:
+                await finish_pack(parts["pack"], response, parts["error"], parts)
+                continue
+            parse_start = time.perf_counter()
+            try:
+                if parts["error"]:
+                    raise parts["error"]
+                record = merge_chunk_responses(file_name, file_content, parts["responses"])
+            except (RequestFailed, KeyError, IndexError, ValueError) as e:
+                if escalate(file_name, file_content, parts, None):
+                    continue
+                print(f"Failed {file_name['filename']}: {e}")
+                failed.append(file_name['filename'])
+                if on_failure:
+                    on_failure(file_name, e)
+                if metrics:
+                    metrics.file(filename=file_name['filename'], status="failed", parse_seconds=time.perf_counter() - parse_start)
+                continue
+            if escalate(file_name, file_content, parts, record):
+                continue
+            finish(record, parts)
+            if metrics:
+                metrics.file(filename=file_name['filename'], status="ok", parse_seconds=time.perf_counter() - parse_start,
+                             **({"tier": tier["name"]} if tier else {}))
+            completed += 1
+            print(f"[{completed}/{total}] {file_name['filename']} ({time.time() - start_time:.2f}s)")
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=build_headers(), limits=limits, timeout=None) as client:
+        scheduler = RequestScheduler(client, **(scheduler_options or {}))
+        await asyncio.gather(*(worker(scheduler) for _ in range(concurrency)))
+    print(f"Processed {completed} files in {time.time() - start_time:.2f} seconds ({scheduler.retries} retries)")
+    report_prefix_stats(prefix_stats)
+    if cascade:
+        cascade.report()
+
+
+async def run_worker(queue, owner, concurrency, source, poll_interval=5.0, **options):
+    """
+    Work through a shared JobQueue: lease a job whenever a slot is free,
+    heartbeat the leases held, and write each result or failure back. Runs
+    until no job is queued or leased anywhere; while other workers hold the
+    remaining leases it keeps polling, so a lease that expires because its
+    worker died is picked up here.
+    """
+    held = {}  # filename -> job id
+
+    async def refill():
+        while True:
+            leased = await asyncio.to_thread(queue.lease, owner, 1)
+            contents = await asyncio.to_thread(
+                lambda: [content for _, content in source.read_many([file_name['filename'] for _, file_name in leased])])
+            jobs = []
+            for (job_id, file_name), file_content in zip(leased, contents):
+                if file_content is None:
+                    queue.fail(owner, job_id, f"{file_name['filename']} not found", retry=False)
+                    continue
+                jobs.append((file_name, file_content))
+                held[file_name['filename']] = job_id
+            if jobs:
+                return jobs
+            if not leased and not await asyncio.to_thread(queue.unfinished):
+                return []
+            if not leased:
+                await asyncio.sleep(poll_interval)
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            await asyncio.to_thread(queue.heartbeat, owner, list(held.values()))
+
+    def on_result(record):
+        if source.revision:
+            record["revision"] = source.revision
+        if not queue.complete(owner, held.pop(record['filename']), record):
+            print(f"Lease on {record['filename']} was lost, keeping the other worker's result")
+
+    def on_failure(file_name, error):
+        queue.fail(owner, held.pop(file_name['filename']), error)
+
+    beating = asyncio.create_task(heartbeat())
+    try:
+        await run_async([], concurrency, on_result, [], refill=refill, on_failure=on_failure, **options)
+    finally:
+        beating.cancel()
+
+
+def work(queue_path, queue_name="default", worker_id=None, concurrency=10, cache_path="response_cache.db",
+         lease_seconds=900, max_attempts=3, metrics_path=None, source=None, **options):
+    queue = JobQueue(queue_path, queue_name, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    owner = worker_id or f"{os.uname().nodename}:{os.getpid()}"
+    cache = ResponseCache(cache_path) if cache_path else None
+    metrics = RunMetrics(metrics_path, concurrency, "worker") if metrics_path else None
+    print(f"Worker {owner} on queue {queue_name} in {queue_path}")
+    source = source or DirectorySource(SOURCE_ROOT)
+    asyncio.run(run_worker(queue, owner, concurrency, source, cache=cache, metrics=metrics, **options))
+    source.close()
+    if metrics:
+        metrics.close()
+    if cache:
+        print(f"Response cache: {cache.hits} hits, {cache.misses} misses")
+        cache.close()
+    counts = queue.counts()
+    print(f"Queue {queue_name}: " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+    queue.close()
+
+
+def main(mode="process", concurrency=10, cache_path="response_cache.db", cache_max_bytes=None, cache_max_age=None,
+         incremental=False, checkpoint_path="service_extraction.jsonl", max_chunk_tokens=None, scheduler_options=None,
+         sink_libraries_path=None, package_jsons=None, import_graph_path=None, store_path=None, run_name=None,
+         metrics_path=None, stream_options=None, api_url=API_URL, pack_options=None, local_rules=False,
+         symbol_index_path=None, cascade=None, locate_evidence=False, source=None, dedup_threshold=None):
+    file_info = json.load(open('sink_files.json', 'r'))
+    files_not_found = []
+    failed = []
+    source = source or DirectorySource(SOURCE_ROOT)
+    jobs = load_sources(source, file_info, files_not_found)
+    source.close()
+    if sink_libraries_path:
+        libraries = select_sink_libraries(load_sink_libraries(sink_libraries_path),
+                                          load_dependencies(package_jsons) if package_jsons else None)
+        reaches = None
+        if import_graph_path:
+            graph = ImportGraph.open(REPO_ROOT, import_graph_path)
+            index = ReachabilityIndex(graph, sink_importers(graph, libraries))
+            reaches = lambda filename: index.reaches_any(os.path.relpath(f"{SOURCE_ROOT}/{filename}", REPO_ROOT))
+        else:
+            print("Warning: prefiltering without --import-graph; files that only reach a sink through local "
+                  "wrapper modules (e.g. a storage service) will be skipped")
+        jobs, skipped = prefilter(jobs, libraries, reaches)
+        print(f"Prefilter: {len(skipped)} files import no sink-capable library and are skipped")
+    reused = {}
+    pending = jobs
+    if incremental:
+        reused, pending = plan_incremental(jobs, 'service_extraction.json')
+    # Resume from the checkpoint of an interrupted run
+    checkpoint = CheckpointWriter(checkpoint_path)
+    if checkpoint.done:
+        print(f"Resuming: {len(checkpoint.done)} files already in {checkpoint_path}")
+    pending = [job for job in pending if job[0]['filename'] not in checkpoint.done]
+    for filename, item in reused.items():
+        if filename not in checkpoint.done:
+            checkpoint.write(item)
+    on_result = checkpoint.write
+    duplicates = {}
+    if dedup_threshold:
+        pending, duplicates, on_result = apply_near_duplicates(pending, dedup_threshold, on_result)
+    hints = None
+    if local_rules:
+        pending, hints = apply_local_rules(pending, on_result)
+
+    cache = ResponseCache(cache_path, max_bytes=cache_max_bytes, max_age=cache_max_age) if cache_path else None
+    metrics = RunMetrics(metrics_path, concurrency, mode) if metrics_path else None
+    if mode == "async":
+        asyncio.run(run_async(pending, concurrency, on_result, failed, cache=cache,
+                              max_chunk_tokens=max_chunk_tokens, scheduler_options=scheduler_options, metrics=metrics,
+                              stream_options=stream_options, api_url=api_url, pack_options=pack_options, hints=hints,
+                              cascade=cascade))
+    else:
+        timeout = (scheduler_options or {}).get("timeout", 600)
+        run_processes(pending, concurrency, on_result, failed, cache=cache, timeout=timeout, metrics=metrics,
+                      api_url=api_url, hints=hints)
+    # Duplicates of a failed representative have no result either
+    failed.extend([file_name['filename'] for filename in failed for file_name, _, _ in duplicates.get(filename, [])])
+    checkpoint.close()
+    if metrics:
+        metrics.close()
+        print(f"Request metrics appended to {metrics_path}, summarize them with: python metrics.py {metrics_path}")
+    if cache:
+        print(f"Response cache: {cache.hits} hits, {cache.misses} misses")
+        cache.evict()
+        cache.close()
+
+    # Keep the sink_files.json order regardless of completion order
+    count = compact_checkpoint(checkpoint_path, 'service_extraction.json', [file_name['filename'] for file_name, _ in jobs])
+    print(f"Saved {count} service extraction results to service_extraction.json")
+    if locate_evidence or symbol_index_path or source.revision:
+        records = json.load(open('service_extraction.json', 'r'))
+        for record in records:
+            if source.revision:
+                # Reports link to the analyzed commit
+                record["revision"] = source.revision
+        if locate_evidence:
+            contents = {file_name['filename']: file_content for file_name, file_content in jobs}
+            services = 0
+            missing = []
+            for record in records:
+                count, not_found = locate_record(record, contents[record['filename']])
+                services += count
+                missing.extend(f"{service} in {record['filename']}" for service in not_found)
+            print(f"Evidence: located {services - len(missing)} of {services} snippets in their files")
+            if missing:
+                print(f"Evidence not found, possibly hallucinated: {missing}")
+        if symbol_index_path:
+            index = SymbolIndex.open(REPO_ROOT, symbol_index_path)
+            services, resolved = annotate_results(
+                records, index, lambda filename: os.path.relpath(f"{SOURCE_ROOT}/{filename}", REPO_ROOT))
+            print(f"Symbol index: traced {resolved} of {services} services to a library")
+        with open('service_extraction.json', 'w') as f:
+            json.dump(records, f, indent=4)
+    if store_path:
+        store = ResultsStore(store_path)
+        run_name = run_name or time.strftime("%Y-%m-%dT%H:%M:%S")
+        store.import_json('service_extraction.json', run=run_name)
+        store.close()
+        print(f"Stored the results as run {run_name} in {store_path}")
+    if failed:
+        # Keep the checkpoint so that re-running only retries the failures
+        print(f"{len(failed)} files failed, re-run to retry them: {failed}")
+    else:
+        os.remove(checkpoint_path)
+    print(f"{len(files_not_found)} files not found")
     print(f"Files not found: {files_not_found}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract data sink services from the files in sink_files.json")
+    parser.add_argument("--mode", choices=["process", "async"], default="process",
+                        help="process: one process per file in fixed batches; async: bounded asyncio worker pool")
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="batch size in process mode, requests in flight in async mode")
+    parser.add_argument("--cache", default="response_cache.db",
+                        help="SQLite file caching raw completions by prompt and model parameters")
+    parser.add_argument("--no-cache", action="store_true", help="always call the API")
+    parser.add_argument("--cache-max-mb", type=float, default=None,
+                        help="evict least recently used completions beyond this size")
+    parser.add_argument("--cache-max-age-days", type=float, default=None,
+                        help="evict completions older than this")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse results from service_extraction.json for files whose content hash is unchanged")
+    parser.add_argument("--checkpoint", default="service_extraction.jsonl",
+                        help="append-only JSONL of finished files; an interrupted run resumes from it")
+    parser.add_argument("--max-chunk-tokens", type=int, default=None,
+                        help="async mode: split larger files on top-level declarations and extract the chunks concurrently")
+    parser.add_argument("--rpm", type=int, default=None, help="async mode: requests per minute budget")
+    parser.add_argument("--tpm", type=int, default=None, help="async mode: tokens per minute budget")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="async mode: retries for 429s, 5xxs and timeouts, with jittered exponential backoff")
+    parser.add_argument("--timeout", type=float, default=600, help="per-request timeout in seconds")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="skip files that import none of the sink-capable libraries the project depends on; "
+                             "use with --import-graph to keep files that reach one through local wrappers")
+    parser.add_argument("--sink-libraries", default="sink_libraries.txt",
+                        help="sink-capable libraries for --prefilter, one per line")
+    parser.add_argument("--package-json", action="append", default=None,
+                        help="package.json to read dependencies from (repeatable, defaults to the twenty ones)")
+    parser.add_argument("--import-graph", default=None,
+                        help="with --prefilter, also keep files reaching a sink-library importer through local imports; "
+                             "the graph is persisted to this file and updated incrementally")
+    parser.add_argument("--store", default=None,
+                        help="also import the results into this SQLite results store (see results_store.py)")
+    parser.add_argument("--run-name", default=None, help="run name in --store, defaults to the current time")
+    parser.add_argument("--metrics", default=None,
+                        help="append per-request timings, token counts, retries and bytes to this JSONL file")
+    parser.add_argument("--stream", action="store_true",
+                        help="async mode: stream completions, spooling the reasoning to --reasoning-dir and checking "
+                             "the JSON answer as it arrives")
+    parser.add_argument("--reasoning-dir", default="reasoning_traces",
+                        help="with --stream, where in-progress traces are written; traces of aborted requests stay there")
+    parser.add_argument("--max-reasoning-tokens", type=int, default=None,
+                        help="with --stream, abort a request whose reasoning grows beyond this many tokens")
+    parser.add_argument("--api-url", default=API_URL,
+                        help="chat completions endpoint (default from EXTRACTION_API_URL, else Fireworks)")
+    parser.add_argument("--pack-tokens", type=int, default=None,
+                        help="async mode: send files of up to half this many tokens several to a request, "
+                             "up to this many tokens of source per request")
+    parser.add_argument("--pack-max-files", type=int, default=8, help="with --pack-tokens, files per request")
+    parser.add_argument("--cascade", default=None,
+                        help="async mode: comma separated fast models to try before deepseek-r1, cheapest first, "
+                             "e.g. accounts/fireworks/models/deepseek-v3")
+    parser.add_argument("--cascade-max-tokens", type=int, default=4096, help="with --cascade, max_tokens of the fast tiers")
+    parser.add_argument("--escalate-on", default="invalid,confidence,rules,size",
+                        help="with --cascade, comma separated triggers for sending a file to the next tier, "
+                             "from invalid, empty, confidence, rules, size (see cascade.py)")
+    parser.add_argument("--min-confidence", type=float, default=0.7,
+                        help="with --cascade, escalate answers that report a lower confidence")
+    parser.add_argument("--escalate-file-tokens", type=int, default=4000,
+                        help="with --cascade, larger files go straight to deepseek-r1")
+    parser.add_argument("--local-rules", action="store_true",
+                        help="extract the sinks of files the static rules in sink_rules.py fully explain without "
+                             "calling the API, and send the rule candidates of the other files as prompt hints")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="send one file per cluster of near duplicates (estimated Jaccard similarity of their "
+                             "token shingles at least this, e.g. 0.85) and reuse its result for the others, unless "
+                             "their differing lines touch sink calls")
+    parser.add_argument("--source", default=SOURCE_ROOT,
+                        help="where to read the files: a directory (the parent of the repository), REPO@REVISION "
+                             "for a commit of a git repository, or a .tar(.gz)/.zip archive of the repository")
+    parser.add_argument("--source-prefix", default="twenty/",
+                        help="with a git or archive --source, prefix of the sink_files.json paths to strip")
+    parser.add_argument("--locate-evidence", action="store_true",
+                        help="find every evidence snippet in its file, add start_line/end_line and flag the ones "
+                             "that are not there with evidence_found: false")
+    parser.add_argument("--symbol-index", default=None,
+                        help="trace every detected service to the library it comes from with this persisted "
+                             "symbol index (see symbol_index.py) and add it to the results as `origin`")
+    parser.add_argument("--job-queue", default=None,
+                        help="run as a worker on this shared job queue (see job_queue.py) instead of over sink_files.json")
+    parser.add_argument("--queue-name", default="default", help="with --job-queue, the queue to work on")
+    parser.add_argument("--worker-id", default=None, help="with --job-queue, lease owner name, defaults to host:pid")
+    parser.add_argument("--lease-seconds", type=float, default=900,
+                        help="with --job-queue, lease length; leases are renewed every third of it while a job runs")
+    parser.add_argument("--max-attempts", type=int, default=3, help="with --job-queue, attempts before a job is failed")
+    args = parser.parse_args()
+    scheduler_options = {
+        "requests_per_minute": args.rpm,
+        "tokens_per_minute": args.tpm,
+        "max_retries": args.max_retries,
+        "timeout": args.timeout,
+    }
+    stream_options = {
+        "reasoning_dir": args.reasoning_dir,
+        "max_reasoning_tokens": args.max_reasoning_tokens,
+    } if args.stream else None
+    cascade = Cascade(make_tiers(args.cascade.split(","), args.cascade_max_tokens), args.escalate_on.split(","),
+                      args.min_confidence, args.escalate_file_tokens) if args.cascade else None
+    source = open_source(args.source, args.source_prefix)
+    if args.job_queue:
+        work(
+            args.job_queue,
+            queue_name=args.queue_name,
+            worker_id=args.worker_id,
+            concurrency=args.concurrency,
+            cache_path=None if args.no_cache else args.cache,
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            metrics_path=args.metrics,
+            max_chunk_tokens=args.max_chunk_tokens,
+            scheduler_options=scheduler_options,
+            stream_options=stream_options,
+            api_url=args.api_url,
+            cascade=cascade,
+            source=source,
+        )
+    else:
+        main(
+            mode=args.mode,
+            concurrency=args.concurrency,
+            cache_path=None if args.no_cache else args.cache,
+            cache_max_bytes=int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None,
+            cache_max_age=args.cache_max_age_days * 86400 if args.cache_max_age_days else None,
+            incremental=args.incremental,
+            checkpoint_path=args.checkpoint,
+            max_chunk_tokens=args.max_chunk_tokens,
+            scheduler_options=scheduler_options,
+            sink_libraries_path=args.sink_libraries if args.prefilter else None,
+            package_jsons=args.package_json or PACKAGE_JSONS,
+            import_graph_path=args.import_graph,
+            store_path=args.store,
+            run_name=args.run_name,
+            metrics_path=args.metrics,
+            stream_options=stream_options,
+            api_url=args.api_url,
+            pack_options={"budget": args.pack_tokens, "max_files": args.pack_max_files} if args.pack_tokens else None,
+            local_rules=args.local_rules,
+            dedup_threshold=args.dedup_threshold,
+            symbol_index_path=args.symbol_index,
+            cascade=cascade,
+            locate_evidence=args.locate_evidence,
+            source=source,
+        )
@@ -1,46 +1,156 @@
 #!/usr/bin/env python3
+import argparse
 import json
+import os
+import re
+from multiprocessing import Pool
+
+from json_output import write_json_array
+
+# Known labelled fields of a data_sinks.txt record; other "Label: value"
+# lines are kept too, under a snake_cased key
+FIELDS = {
+    'Code summary:': 'code_summary',
+    'Data sink code fragments:': 'data_sink_code_fragments',
+}
+LABEL = re.compile(r'^([A-Z][A-Za-z ]{0,40}):(.*)$')
+# (marker, replacement): everything up to and including the marker is replaced
+DEFAULT_REWRITES = [('/twenty-main', 'twenty')]
+
+
+def rewrite_path(path, rewrites):
+    for marker, replacement in rewrites:
+        if marker in path:
+            return replacement + path.split(marker, 1)[1]
+    return path
+
+
+def is_complete(entry):
+    return 'filename' in entry and 'code_summary' in entry
+
+
+def parse_records(lines, rewrites=DEFAULT_REWRITES):
+    """
+    Yield one dict per record of a data_sinks.txt stream as soon as the
+    record is complete. Lines that do not start a new field are appended to
+    the previous field, so multi-line summaries and fragments are kept whole.
+    """
+    current = {}
+    last_key = None
+    for line in lines:
+        line = line.strip()
+        # Skip empty lines or separator lines
+        if not line or line.startswith('----'):
+            # If we have a complete entry, emit it
+            if is_complete(current):
+                yield current
+                current = {}
+            last_key = None
+            continue
+
+        # If line contains a file path (starts with /)
+        if line.startswith('/'):
+            current['filename'] = rewrite_path(line, rewrites)
+            last_key = None
+            continue
+        for prefix, key in FIELDS.items():
+            if line.startswith(prefix):
+                current[key] = line[len(prefix):].strip()
+                last_key = key
+                break
+        else:
+            match = LABEL.match(line)
+            if match:
+                last_key = match.group(1).strip().lower().replace(' ', '_')
+                current[last_key] = match.group(2).strip()
+            elif last_key:
+                current[last_key] += '\n' + line
+
+    # Emit the last entry if complete
+    if is_complete(current):
+        yield current
+
+
+def split_ranges(input_file, chunk_bytes):
+    """
+    Byte ranges of roughly chunk_bytes that start on a record separator, so
+    each one can be parsed on its own.
+    """
+    size = os.path.getsize(input_file)
+    starts = [0]
+    with open(input_file, 'rb') as f:
+        while starts[-1] + chunk_bytes < size:
+            f.seek(starts[-1] + chunk_bytes)
+            f.readline()
+            while True:
+                position = f.tell()
+                line = f.readline()
+                if not line or line.startswith(b'----'):
+                    break
+            if position >= size:
+                break
+            starts.append(position)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def parse_range(args):
+    input_file, start, end, rewrites = args
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        lines = f.read(end - start).decode('utf-8').splitlines()
+    return list(parse_records(lines, rewrites))
+
+
+def iter_records(input_file, rewrites=DEFAULT_REWRITES, workers=1, chunk_bytes=8 * 1024 * 1024):
+    """
+    Stream records from data_sinks.txt in file order. With several workers
+    the file is cut into chunk_bytes ranges on record boundaries and parsed
+    in parallel; only a few ranges are held in memory at a time.
+    """
+    if workers <= 1:
+        with open(input_file, 'r') as f:
+            yield from parse_records(f, rewrites)
+        return
+    ranges = [(input_file, start, end, rewrites) for start, end in split_ranges(input_file, chunk_bytes)]
+    with Pool(workers) as pool:
+        for entries in pool.imap(parse_range, ranges):
+            yield from entries
+
 
 def extract_info(input_file):
-    entries = []
-    current_entry = {}
-    
-    with open(input_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            # Skip empty lines or separator lines
-            if not line or line.startswith('----'):
-                # If we have a complete entry, add it
-                if current_entry and 'filename' in current_entry and 'code_summary' in current_entry:
-                    entries.append(current_entry)
-                    current_entry = {}
-                continue
-                
-            # If line contains a file path (starts with /)
-            if line.startswith('/'):
-                if 'twenty-main' in line:
-                    parts = line.split('twenty-main')
-                    filename = f"twenty{parts[1]}"
-                else:
-                    filename = line
-                current_entry['filename'] = filename
-            # If line starts with 'Code summary:'
-            elif line.startswith('Code summary:'):
-                current_entry['code_summary'] = line[len('Code summary:'):].strip()
-    
-    # Add the last entry if complete
-    if current_entry and 'filename' in current_entry and 'code_summary' in current_entry:
-        entries.append(current_entry)
-    
-    return entries
+    return list(iter_records(input_file))
+
+
+def write_jsonl(records, output_file):
+    count = 0
+    with open(output_file, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+            count += 1
+    return count
+
+
+def parse_rewrite(value):
+    marker, _, replacement = value.partition('=')
+    return marker, replacement
+
 
 def main():
-    input_file = 'data_sinks.txt'
-    entries = extract_info(input_file)
-    
-    # Write output to a file as JSON
-    with open('sink_files.json', 'w') as f:
-        json.dump(entries, f, indent=2)
+    parser = argparse.ArgumentParser(description="Extract the flagged files and their summaries from data_sinks.txt")
+    parser.add_argument('input_file', nargs='?', default='data_sinks.txt')
+    parser.add_argument('--output', default='sink_files.json', help="JSON array output")
+    parser.add_argument('--jsonl', default=None, help="write JSON lines to this file instead of a JSON array")
+    parser.add_argument('--rewrite', action='append', type=parse_rewrite, default=None, metavar='MARKER=REPLACEMENT',
+                        help="replace everything up to MARKER in file paths (repeatable, default /twenty-main=twenty)")
+    parser.add_argument('--workers', type=int, default=1, help="parse the input in parallel with this many processes")
+    args = parser.parse_args()
+
+    records = iter_records(args.input_file, args.rewrite or DEFAULT_REWRITES, workers=args.workers)
+    if args.jsonl:
+        count = write_jsonl(records, args.jsonl)
+    else:
+        count = write_json_array(records, args.output, indent=2)
+    print(f"Extracted {count} entries to {args.jsonl or args.output}")
 
 if __name__ == "__main__":
     main()
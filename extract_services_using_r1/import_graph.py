@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import posixpath
+import re
+
+from prefilter import IMPORT_SPECIFIER, is_sink_library, load_sink_libraries, package_name
+
+SOURCE_EXTENSIONS = ('.ts', '.tsx', '.js', '.jsx', '.mjs', '.cjs')
+SKIP_DIRS = {'node_modules', 'dist', 'build', '.git', '.next', 'coverage'}
+TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+def strip_json_comments(text):
+    # tsconfig.json allows comments; drop them without touching strings like "http://..."
+    out = []
+    i = 0
+    in_string = False
+    while i < len(text):
+        c = text[i]
+        if in_string:
+            out.append(c)
+            if c == '\\':
+                out.append(text[i + 1:i + 2])
+                i += 1
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+            out.append(c)
+        elif text.startswith('//', i):
+            i = text.find('\n', i)
+            if i == -1:
+                break
+            continue
+        elif text.startswith('/*', i):
+            i = text.find('*/', i) + 2
+            if i == 1:
+                break
+            continue
+        else:
+            out.append(c)
+        i += 1
+    return TRAILING_COMMA.sub(r'\1', ''.join(out))
+
+
+def load_tsconfig(root, rel_path, seen=None):
+    """
+    compilerOptions of a tsconfig (relative to root), with `extends` applied.
+    baseUrl and paths are returned relative to root.
+    """
+    seen = seen or set()
+    if rel_path in seen:
+        return {}
+    seen.add(rel_path)
+    with open(os.path.join(root, rel_path), 'r') as f:
+        config = json.loads(strip_json_comments(f.read()))
+    config_dir = posixpath.dirname(rel_path)
+    options = {}
+    parent = config.get('extends')
+    if isinstance(parent, str) and parent.startswith('.'):
+        parent = posixpath.normpath(posixpath.join(config_dir, parent))
+        if not parent.endswith('.json'):
+            parent += '.json'
+        if os.path.exists(os.path.join(root, parent)):
+            options.update(load_tsconfig(root, parent, seen))
+    compiler_options = config.get('compilerOptions', {})
+    if 'baseUrl' in compiler_options:
+        options['baseUrl'] = posixpath.normpath(posixpath.join(config_dir, compiler_options['baseUrl']))
+    if 'paths' in compiler_options:
+        # paths are relative to baseUrl, or to the tsconfig itself without one
+        options['paths'] = compiler_options['paths']
+        options['pathsBase'] = options.get('baseUrl', config_dir)
+    return options
+
+
+class ImportGraph:
+    """
+    Directed graph of local imports between the TS/JS files under `root`:
+    if B imports from A there is an edge B -> A. Imports that do not resolve
+    to a file in the repo are kept per file as external package names.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.files = {}
+        self.tsconfigs = {}
+        self.tsconfig_options = {}
+
+    # --- scanning ---------------------------------------------------------
+
+    def walk(self):
+        sources = {}
+        tsconfigs = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(path, self.root).replace(os.sep, '/')
+                if filename.endswith(SOURCE_EXTENSIONS) and not filename.endswith('.d.ts'):
+                    stat = os.stat(path)
+                    sources[rel_path] = [stat.st_mtime, stat.st_size]
+                elif filename == 'tsconfig.json':
+                    tsconfigs[rel_path] = os.stat(path).st_mtime
+        return sources, tsconfigs
+
+    def nearest_tsconfig(self, rel_path):
+        directory = posixpath.dirname(rel_path)
+        while True:
+            candidate = posixpath.join(directory, 'tsconfig.json') if directory else 'tsconfig.json'
+            if candidate in self.tsconfig_options:
+                return self.tsconfig_options[candidate]
+            if not directory:
+                return {}
+            directory = posixpath.dirname(directory)
+
+    def resolve_file(self, rel_path, sources):
+        if rel_path in sources:
+            return rel_path
+        for ext in SOURCE_EXTENSIONS:
+            if rel_path + ext in sources:
+                return rel_path + ext
+        for ext in SOURCE_EXTENSIONS:
+            if f"{rel_path}/index{ext}" in sources:
+                return f"{rel_path}/index{ext}"
+        return None
+
+    def resolve(self, importer, specifier, sources):
+        if specifier.startswith('.'):
+            return self.resolve_file(posixpath.normpath(posixpath.join(posixpath.dirname(importer), specifier)), sources)
+        options = self.nearest_tsconfig(importer)
+        for pattern, targets in options.get('paths', {}).items():
+            if pattern.endswith('*'):
+                if not specifier.startswith(pattern[:-1]):
+                    continue
+                rest = specifier[len(pattern) - 1:]
+            elif specifier != pattern:
+                continue
+            else:
+                rest = ''
+            for target in targets:
+                resolved = self.resolve_file(posixpath.normpath(posixpath.join(options['pathsBase'], target.replace('*', rest))), sources)
+                if resolved:
+                    return resolved
+        if 'baseUrl' in options:
+            return self.resolve_file(posixpath.normpath(posixpath.join(options['baseUrl'], specifier)), sources)
+        return None
+
+    def read_specifiers(self, rel_path):
+        try:
+            with open(os.path.join(self.root, rel_path), 'r', errors='replace') as f:
+                return sorted(set(IMPORT_SPECIFIER.findall(f.read())))
+        except OSError:
+            return []
+
+    def link(self, rel_path, specifiers, sources):
+        imports = set()
+        packages = set()
+        for specifier in specifiers:
+            resolved = self.resolve(rel_path, specifier, sources)
+            if resolved:
+                imports.add(resolved)
+            elif not specifier.startswith('.'):
+                packages.add(package_name(specifier))
+        return {'imports': sorted(imports), 'packages': sorted(packages)}
+
+    def update(self):
+        """
+        Bring the graph up to date with the files on disk, re-reading only
+        files whose mtime or size changed. Returns the number re-read.
+        Adding or removing files, or editing a tsconfig, can change how the
+        imports of unchanged files resolve, so then every file is re-linked
+        from its stored specifiers (no file I/O).
+        """
+        sources, tsconfigs = self.walk()
+        relink = tsconfigs != self.tsconfigs or sources.keys() != self.files.keys()
+        if tsconfigs != self.tsconfigs:
+            self.tsconfigs = tsconfigs
+            self.tsconfig_options = {}
+            for rel_path in tsconfigs:
+                try:
+                    self.tsconfig_options[rel_path] = load_tsconfig(self.root, rel_path)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping unreadable {rel_path}: {e}")
+        parsed = 0
+        files = {}
+        for rel_path, stat in sources.items():
+            entry = self.files.get(rel_path)
+            if entry is None or entry['stat'] != stat:
+                entry = {'stat': stat, 'specifiers': self.read_specifiers(rel_path)}
+                entry.update(self.link(rel_path, entry['specifiers'], sources))
+                parsed += 1
+            elif relink:
+                entry.update(self.link(rel_path, entry['specifiers'], sources))
+            files[rel_path] = entry
+        self.files = files
+        return parsed
+
+    # --- persistence ------------------------------------------------------
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'root': self.root, 'tsconfigs': self.tsconfigs, 'files': self.files}, f)
+
+    @classmethod
+    def load(cls, path, root=None):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        graph = cls(root or data['root'])
+        graph.files = data['files']
+        # tsconfig options are cheap to re-read and are needed by update()
+        for rel_path in data['tsconfigs']:
+            try:
+                graph.tsconfig_options[rel_path] = load_tsconfig(graph.root, rel_path)
+            except (OSError, ValueError):
+                pass
+        graph.tsconfigs = data['tsconfigs']
+        return graph
+
+    @classmethod
+    def open(cls, root, path):
+        """
+        Load the persisted graph at `path` and update it, or build it from scratch.
+        """
+        graph = cls.load(path, root) if os.path.exists(path) else cls(root)
+        parsed = graph.update()
+        print(f"Import graph: {len(graph.files)} files, {parsed} (re)read")
+        graph.save(path)
+        return graph
+
+
+def strongly_connected_components(adjacency):
+    """
+    Iterative Tarjan. Components come out in reverse topological order: every
+    component is emitted after all the components it can reach.
+    """
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for start in range(len(adjacency)):
+        if start in index:
+            continue
+        work = [(start, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack.add(node)
+            recurse = False
+            for i in range(child, len(adjacency[node])):
+                succ = adjacency[node][i]
+                if succ not in index:
+                    work.append((node, i + 1))
+                    work.append((succ, 0))
+                    recurse = True
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            if recurse:
+                continue
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+    return components
+
+
+class ReachabilityIndex:
+    """
+    Precomputed answers to "which target files can this file reach through
+    its imports". The graph is condensed into strongly connected components
+    and every component gets a bitset (a Python int) of the targets it
+    reaches, so a query is a dictionary lookup.
+    """
+
+    def __init__(self, graph, targets):
+        self.nodes = sorted(graph.files)
+        position = {node: i for i, node in enumerate(self.nodes)}
+        adjacency = [[position[dep] for dep in graph.files[node]['imports'] if dep in position] for node in self.nodes]
+        self.targets = sorted(set(targets) & set(position))
+        target_bit = {position[target]: 1 << i for i, target in enumerate(self.targets)}
+
+        self.component_of = {}
+        self.component_reach = []
+        for component in strongly_connected_components(adjacency):
+            c = len(self.component_reach)
+            for node in component:
+                self.component_of[node] = c
+            reach = 0
+            for node in component:
+                reach |= target_bit.get(node, 0)
+                for succ in adjacency[node]:
+                    # successors outside this component were emitted earlier
+                    if self.component_of[succ] != c:
+                        reach |= self.component_reach[self.component_of[succ]]
+            self.component_reach.append(reach)
+        self.position = position
+
+    def reach_bits(self, path):
+        node = self.position.get(path)
+        return 0 if node is None else self.component_reach[self.component_of[node]]
+
+    def reaches_any(self, path):
+        return self.reach_bits(path) != 0
+
+    def reached_targets(self, path):
+        bits = self.reach_bits(path)
+        return [target for i, target in enumerate(self.targets) if bits >> i & 1]
+
+
+def sink_importers(graph, libraries):
+    """
+    Files that import a sink-capable library directly (the "grep" step of plan.md).
+    """
+    return [
+        path for path, entry in graph.files.items()
+        if any(is_sink_library(package, libraries) for package in entry['packages'])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the import graph of a repo and check which flagged files reach sink-library importers")
+    parser.add_argument("root", help="repository root, e.g. /home/suchitg/DataCare/twenty")
+    parser.add_argument("--graph", default="import_graph.json", help="persisted adjacency list, updated incrementally")
+    parser.add_argument("--sink-libraries", default="sink_libraries.txt")
+    parser.add_argument("--files", default="sink_files.json", help="flagged files to check")
+    parser.add_argument("--prefix", default="twenty/", help="prefix of the flagged filenames relative to the root")
+    args = parser.parse_args()
+
+    graph = ImportGraph.open(args.root, args.graph)
+    targets = sink_importers(graph, load_sink_libraries(args.sink_libraries))
+    index = ReachabilityIndex(graph, targets)
+    print(f"{len(targets)} files import a sink-capable library")
+
+    flagged = [item['filename'] for item in json.load(open(args.files, 'r'))]
+    reaching = 0
+    for filename in flagged:
+        path = filename[len(args.prefix):] if filename.startswith(args.prefix) else filename
+        if index.reaches_any(path):
+            reaching += 1
+        else:
+            print(f"Does not reach a sink-library importer: {filename}")
+    print(f"{reaching} of {len(flagged)} flagged files reach a sink-library importer")
+
+
+if __name__ == "__main__":
+    main()
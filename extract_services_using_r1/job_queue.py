@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+from json_output import write_json_array
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    queue TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL,
+    UNIQUE (queue, filename)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (queue, status, id);
+"""
+
+
+class JobQueue:
+    """
+    File-backed queue of extraction jobs, one per sink_files.json entry.
+    Workers lease jobs for `lease_seconds` and keep the lease alive with
+    heartbeat(); a lease that runs out (the worker died or hung) makes the
+    job available to the next lease() call. A job whose attempts reach
+    `max_attempts` is marked failed instead of being retried forever.
+
+    Uses SQLite's rollback journal rather than WAL so that workers on
+    several machines can share the file on a volume with working POSIX
+    locks.
+    """
+
+    def __init__(self, path, queue="default", lease_seconds=900, max_attempts=3):
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.queue = queue
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Workers call in from asyncio.to_thread as well as the event loop
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def transaction(self, statements):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self.conn)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def submit(self, entries):
+        """
+        Enqueue one job per entry. Entries already in the queue, finished or
+        not, are left alone. Returns the number of new jobs.
+        """
+        now = time.time()
+
+        def insert(conn):
+            count = 0
+            for entry in entries:
+                count += conn.execute(
+                    "INSERT OR IGNORE INTO jobs (queue, filename, entry, updated) VALUES (?, ?, ?, ?)",
+                    (self.queue, entry['filename'], json.dumps(entry), now)
+                ).rowcount
+            return count
+        return self.transaction(insert)
+
+    def lease(self, owner, limit=1):
+        """
+        Lease up to `limit` queued or expired jobs to `owner`. Returns
+        [(job_id, entry)].
+        """
+        now = time.time()
+
+        def take(conn):
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired after the last attempt', "
+                "lease_owner = NULL, lease_expires = NULL, updated = ? "
+                "WHERE queue = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.queue, now, self.max_attempts)
+            )
+            rows = conn.execute(
+                "SELECT id, entry FROM jobs WHERE queue = ? AND (status = 'queued' OR (status = 'leased' AND lease_expires < ?)) "
+                "ORDER BY id LIMIT ?", (self.queue, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated = ? "
+                "WHERE id = ?", [(owner, now + self.lease_seconds, now, job_id) for job_id, _ in rows]
+            )
+            return [(job_id, json.loads(entry)) for job_id, entry in rows]
+        return self.transaction(take)
+
+    def heartbeat(self, owner, job_ids):
+        """
+        Extend the leases `owner` still holds. Returns how many it holds.
+        """
+        if not job_ids:
+            return 0
+        now = time.time()
+        return self.transaction(lambda conn: sum(conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now + self.lease_seconds, now, job_id, owner)
+        ).rowcount for job_id in job_ids))
+
+    def complete(self, owner, job_id, result):
+        """
+        Store the result of a leased job. Returns False when the lease was
+        lost to another worker in the meantime; that worker's result wins.
+        """
+        return self.transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, updated = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (json.dumps(result), time.time(), job_id, owner)
+        ).rowcount == 1)
+
+    def fail(self, owner, job_id, error, retry=True):
+        """
+        Give a leased job back: queued again while it has attempts left and
+        `retry` is set, failed otherwise.
+        """
+        return self.transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = CASE WHEN ? AND attempts < ? THEN 'queued' ELSE 'failed' END, error = ?, "
+            "lease_owner = NULL, lease_expires = NULL, updated = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (retry, self.max_attempts, str(error), time.time(), job_id, owner)
+        ).rowcount == 1)
+
+    def requeue(self, statuses=('failed',)):
+        placeholders = ", ".join("?" for _ in statuses)
+        return self.transaction(lambda conn: conn.execute(
+            f"UPDATE jobs SET status = 'queued', attempts = 0, lease_owner = NULL, lease_expires = NULL, updated = ? "
+            f"WHERE queue = ? AND status IN ({placeholders})", (time.time(), self.queue, *statuses)
+        ).rowcount)
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs WHERE queue = ? GROUP BY status", (self.queue,))
+            counts = dict(rows.fetchall())
+        return {status: counts.get(status, 0) for status in ('queued', 'leased', 'done', 'failed')}
+
+    def unfinished(self):
+        counts = self.counts()
+        return counts['queued'] + counts['leased']
+
+    def failures(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT filename, attempts, error FROM jobs WHERE queue = ? AND status = 'failed' ORDER BY id", (self.queue,)
+            ).fetchall()
+
+    def export_json(self, json_path):
+        # In submission order
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT result FROM jobs WHERE queue = ? AND status = 'done' ORDER BY id", (self.queue,)
+            ).fetchall()
+        return write_json_array((json.loads(result) for (result,) in rows), json_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Shared job queue for ext_service.py. Workers are started with "
+                    "python ext_service.py --job-queue DB [--queue-name NAME], on any number of machines.")
+    parser.add_argument("--db", default="jobs.db")
+    parser.add_argument("--queue-name", default="default", help="several queues (e.g. one per repository) can share a file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="enqueue one job per sink_files.json entry")
+    submit_parser.add_argument("files", nargs='?', default="sink_files.json")
+
+    commands.add_parser("status", help="job counts and failures")
+
+    requeue_parser = commands.add_parser("requeue", help="queue failed jobs again")
+    requeue_parser.add_argument("--all", action="store_true", help="also re-run finished jobs")
+
+    export_parser = commands.add_parser("export", help="write the finished results in service_extraction.json format")
+    export_parser.add_argument("json_path", nargs='?', default="service_extraction.json")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db, args.queue_name)
+    if args.command == "submit":
+        with open(args.files, 'r') as f:
+            entries = json.load(f)
+        count = queue.submit(entries)
+        print(f"Submitted {count} new jobs ({len(entries) - count} already queued) to {args.queue_name} in {args.db}")
+    elif args.command == "status":
+        counts = queue.counts()
+        print(", ".join(f"{count} {status}" for status, count in counts.items()))
+        for filename, attempts, error in queue.failures():
+            print(f"failed after {attempts} attempts: {filename}: {error}")
+    elif args.command == "requeue":
+        count = queue.requeue(('failed', 'done') if args.all else ('failed',))
+        print(f"Requeued {count} jobs")
+    elif args.command == "export":
+        count = queue.export_json(args.json_path)
+        print(f"Exported {count} results to {args.json_path}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+import json
+import textwrap
+
+
+def write_json_array(records, path, indent=4):
+    """
+    Write `records` (any iterable) in the layout of json.dump(records, f,
+    indent=indent), one record at a time so they never all need to be in
+    memory. Returns the number of records.
+    """
+    count = 0
+    with open(path, 'w') as f:
+        f.write("[")
+        for record in records:
+            f.write(",\n" if count else "\n")
+            f.write(textwrap.indent(json.dumps(record, indent=indent), " " * indent))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import time
+
+
+class RunMetrics:
+    """
+    Structured per-request instrumentation, appended to a JSONL file:
+      {"type": "run", ...}      once per run: start time and concurrency
+      {"type": "request", ...}  per API call or cache hit: enqueue/start/
+                                first byte/end timestamps, token counts,
+                                retries and bytes
+      {"type": "file", ...}     per file: status and time spent parsing
+      {"type": "end", ...}      once per run: end time
+    """
+
+    def __init__(self, path, concurrency, mode):
+        self.f = open(path, 'a')
+        self.write({"type": "run", "started": time.time(), "concurrency": concurrency, "mode": mode})
+
+    def write(self, record):
+        self.f.write(json.dumps(record) + '\n')
+        self.f.flush()
+
+    def request(self, **fields):
+        self.write({"type": "request", **fields})
+
+    def file(self, **fields):
+        self.write({"type": "file", **fields})
+
+    def close(self):
+        self.write({"type": "end", "ended": time.time()})
+        self.f.close()
+
+
+def load_last_run(path):
+    run = None
+    with open(path, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "run":
+                run = {"run": record, "requests": [], "files": [], "ended": None}
+            elif run is None:
+                continue
+            elif record["type"] == "request":
+                run["requests"].append(record)
+            elif record["type"] == "file":
+                run["files"].append(record)
+            elif record["type"] == "end":
+                run["ended"] = record["ended"]
+    if run is None:
+        raise ValueError(f"No run found in {path}")
+    return run
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def summarize(path, top=10):
+    run = load_last_run(path)
+    requests = [r for r in run["requests"] if not r.get("cached")]
+    started = run["run"]["started"]
+    ended = run["ended"] or max([r["ended"] for r in run["requests"]] + [started])
+    wall = max(ended - started, 1e-9)
+
+    def line(name, values, unit="s"):
+        print(f"{name:<22} p50 {percentile(values, 50):8.2f}{unit}  p95 {percentile(values, 95):8.2f}{unit}  "
+              f"p99 {percentile(values, 99):8.2f}{unit}  max {max(values, default=0):8.2f}{unit}")
+
+    print(f"Run: {run['run']['mode']} mode, concurrency {run['run']['concurrency']}, {wall:.1f}s wall clock")
+    print(f"Requests: {len(requests)} sent, {len(run['requests']) - len(requests)} served from cache, "
+          f"{sum(r.get('retries', 0) for r in requests)} retries, "
+          f"{sum(1 for r in requests if r.get('status') != 'ok')} failed")
+    print(f"Files: {sum(1 for f in run['files'] if f['status'] == 'ok')} ok, "
+          f"{sum(1 for f in run['files'] if f['status'] != 'ok')} failed")
+    print("-" * 80)
+    line("queue wait", [r["started"] - r["enqueued"] for r in requests])
+    line("time to first byte", [r["first_byte"] - r["started"] for r in requests if r.get("first_byte")])
+    line("request latency", [r["ended"] - r["started"] for r in requests])
+    streamed = [r for r in requests if r.get("first_token")]
+    if streamed:
+        line("time to first token", [r["first_token"] - r["started"] for r in streamed])
+        line("reasoning time", [r["reasoning_end"] - r["first_token"] for r in streamed if r.get("reasoning_end")])
+    line("parse time", [f["parse_seconds"] * 1000 for f in run["files"]], unit="ms")
+    line("completion tokens", [r.get("completion_tokens", 0) for r in requests], unit=" ")
+    line("reasoning tokens", [r.get("reasoning_tokens", 0) for r in requests], unit=" ")
+    # Cascade runs: which tier finished each file, and request latency per tier
+    tiers = sorted({r["tier"] for r in requests if r.get("tier")})
+    if tiers:
+        print("-" * 80)
+        for tier in tiers:
+            finished = sum(1 for f in run["files"] if f.get("tier") == tier and f["status"] == "ok")
+            print(f"Tier {tier}: {sum(1 for r in requests if r.get('tier') == tier)} requests, {finished} files finished")
+            line("  latency", [r["ended"] - r["started"] for r in requests if r.get("tier") == tier])
+    print("-" * 80)
+
+    prompt_tokens = sum(r.get("prompt_tokens", 0) for r in requests)
+    completion_tokens = sum(r.get("completion_tokens", 0) for r in requests)
+    busy = sum(r["ended"] - r["started"] for r in requests)
+    print(f"Tokens: {prompt_tokens} prompt, {completion_tokens} completion "
+          f"({completion_tokens / wall:.1f} completion tokens/s overall)")
+    print(f"Bytes: {sum(r.get('request_bytes', 0) for r in requests)} sent, "
+          f"{sum(r.get('response_bytes', 0) for r in requests)} received")
+    print(f"Concurrency utilization: {busy / (wall * run['run']['concurrency']):.0%} "
+          f"(average {busy / wall:.1f} requests in flight)")
+
+    # A chunked file spans several requests; its latency is first start to last end
+    spans = {}
+    for r in requests:
+        first, last = spans.get(r["filename"], (r["started"], r["ended"]))
+        spans[r["filename"]] = (min(first, r["started"]), max(last, r["ended"]))
+    print("-" * 80)
+    print(f"Slowest {top} files:")
+    for filename, (first, last) in sorted(spans.items(), key=lambda entry: entry[1][0] - entry[1][1])[:top]:
+        print(f"{last - first:8.2f}s  {filename}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the per-request metrics of the last ext_service run")
+    parser.add_argument("path", nargs='?', default="metrics.jsonl")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest files to list")
+    args = parser.parse_args()
+    summarize(args.path, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Calls that look like writes, used to make up a plausible answer
+SINK_CALL = re.compile(r'\b(?:this\.)?([A-Za-z_$][\w$]*)\s*\.\s*(save|insert|create|update|delete|upsert|send|emit|'
+                       r'set|put|write|publish|add|execute)\s*\(')
+PACKED_FILE = re.compile(r'File path:\n(.+?)\n\n---\n\nFile content:\n```\n(.*?)\n```\n', re.DOTALL)
+THINK_WORDS = ["The", "file", "uses", "this", "service", "to", "store", "data,", "so", "it", "is", "a", "sink.", "Wait,"]
+
+
+def find_services(user_content, limit=5):
+    services = []
+    for match in SINK_CALL.finditer(user_content):
+        services.append({
+            "service": match.group(1),
+            "evidence": match.group(0) + "...)",
+            "reasoning": f"'{match.group(1)}' is called with {match.group(2)}(), which stores or transmits data.",
+        })
+        if len(services) == limit:
+            break
+    return services
+
+
+def make_answer(user_content, confidence=None):
+    # Several files in one request are answered keyed by file path, each entry
+    # with its own confidence, as cascade.confidence_prompt asks
+    extra = {"confidence": confidence} if confidence is not None else {}
+    if user_content.startswith("This request contains"):
+        files = {path: {"detected_data_sink_services": find_services(content), **extra}
+                 for path, content in PACKED_FILE.findall(user_content)}
+        return json.dumps({"files": files}, indent=4)
+    return json.dumps({"detected_data_sink_services": find_services(user_content), **extra}, indent=4)
+
+
+def make_think(rng, tokens):
+    # ~4 characters per token, like chunking.estimate_tokens
+    words = []
+    length = 0
+    while length < tokens * 4:
+        word = rng.choice(THINK_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+class MockCompletions(BaseHTTPRequestHandler):
+    """
+    Stand-in for an OpenAI-compatible /chat/completions endpoint, streaming
+    or not. Timing follows a simple model: a log-normal time to first token,
+    then think + answer tokens at a fixed decode rate. Models without "r1"
+    in their name answer without a <think> block, and with a confidence
+    when the prompt asks for one.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data):
+        data = data.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        options = self.server.options
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        with self.server.lock:
+            rng = self.server.rng
+            draw = rng.random()
+            ttft = rng.lognormvariate(0, options.ttft_sigma) * options.ttft
+            think_tokens = max(1, int(rng.uniform(1 - options.think_spread, 1 + options.think_spread) * options.think_tokens))
+            think = make_think(rng, think_tokens)
+            malformed = rng.random() < options.malformed_rate
+            confidence = 0.3 if rng.random() < options.low_confidence_rate else 0.9
+            self.server.in_flight += 1
+            in_flight = self.server.in_flight
+        try:
+            if (options.max_in_flight and in_flight > options.max_in_flight) or draw < options.rate_limit_rate:
+                self.send_json(429, {"error": {"message": "Rate limit exceeded"}},
+                               {"Retry-After": str(options.retry_after)})
+                return
+            if draw < options.rate_limit_rate + options.error_rate:
+                time.sleep(ttft)
+                self.send_json(500, {"error": {"message": "Internal server error"}})
+                return
+
+            user_content = payload["messages"][-1]["content"]
+            reasoning = "r1" in (payload.get("model") or "r1")
+            answer = make_answer(user_content, None if reasoning or '"confidence"' not in user_content else confidence)
+            answer = "I think the answer is:\n" + answer if malformed else answer
+            content = f"<think>\n{think}\n</think>\n\n{answer}" if reasoning else answer
+            if not reasoning:
+                think_tokens = 0
+            prompt_tokens = sum(len(message["content"]) + 3 for message in payload["messages"]) // 4
+            completion_tokens = (len(content) + 3) // 4
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "completion_tokens_details": {"reasoning_tokens": think_tokens},
+            }
+            if payload.get("stream"):
+                self.stream(content, usage, ttft)
+            else:
+                time.sleep(ttft + completion_tokens / options.tokens_per_second)
+                self.send_json(200, {
+                    "id": "mock", "object": "chat.completion", "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client aborted the request
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def stream(self, content, usage, ttft):
+        options = self.server.options
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(ttft)
+        step = options.chunk_tokens * 4
+        for start in range(0, len(content), step):
+            delta = {"choices": [{"index": 0, "delta": {"content": content[start:start + step]}}]}
+            self.send_chunk(f"data: {json.dumps(delta)}\n\n")
+            time.sleep(options.chunk_tokens / options.tokens_per_second)
+        self.send_chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+        self.send_chunk("data: [DONE]\n\n")
+        self.send_chunk("")
+
+
+def make_server(options):
+    server = ThreadingHTTPServer((options.host, options.port), MockCompletions)
+    server.daemon_threads = True
+    server.options = options
+    server.rng = random.Random(options.seed)
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    return server
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local stand-in for the chat completions API, for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ttft", type=float, default=1.0, help="median time to first token in seconds")
+    parser.add_argument("--ttft-sigma", type=float, default=0.5, help="log-normal sigma of the time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="decode rate per request")
+    parser.add_argument("--think-tokens", type=int, default=1500, help="mean size of the <think> trace")
+    parser.add_argument("--think-spread", type=float, default=0.5,
+                        help="trace sizes are uniform within this fraction of --think-tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="answer with a 429 beyond this many concurrent requests")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of the 429s, in seconds")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of answers that are not valid JSON")
+    parser.add_argument("--low-confidence-rate", type=float, default=0.1,
+                        help="fraction of non-reasoning answers reporting a low confidence")
+    parser.add_argument("--chunk-tokens", type=int, default=16, help="tokens per streamed event")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser
+
+
+def main():
+    options = build_parser().parse_args()
+    server = make_server(options)
+    print(f"Mock chat completions at http://{options.host}:{server.server_port}/v1/chat/completions", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
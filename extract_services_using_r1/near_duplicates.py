@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import argparse
+import difflib
+import json
+import os
+import re
+import zlib
+
+from prefilter import imported_modules
+from sink_rules import METHOD_CALL, SUSPECT_METHOD, chain_end, find_candidates, line_of, mask_source, skip_generics
+from sources import open_source
+
+TOKEN = re.compile(r'[A-Za-z_$][\w$]*|[0-9][\w.]*|\S')
+SHINGLE_TOKENS = 5
+NUM_BINS = 128
+# An empty bin borrows from the next filled one, shifted out of the range of real values
+BIN_SPAN = 2 ** 32 // NUM_BINS + 1
+# Share of the file pairs at the threshold that LSH must put in a shared bucket
+MIN_RECALL = 0.95
+
+
+def shingles(file_content, k=SHINGLE_TOKENS):
+    """
+    Hashes of the runs of k tokens of the file. Comments, string contents
+    and formatting are masked out first, so they do not count.
+    """
+    tokens = TOKEN.findall(mask_source(file_content))
+    return {zlib.crc32(' '.join(tokens[i:i + k]).encode('utf-8')) for i in range(max(1, len(tokens) - k + 1))} \
+        if tokens else set()
+
+
+def signature(hashes, bins=NUM_BINS):
+    """
+    MinHash signature from a single pass over the shingle hashes (one
+    permutation hashing): each hash falls in bin `hash % bins`, which keeps
+    its smallest value. Empty bins take the value of the next filled bin
+    (rotation densification), so small files still compare bin by bin.
+    None for a file without tokens.
+    """
+    if not hashes:
+        return None
+    mins = [None] * bins
+    for h in hashes:
+        b = h % bins
+        if mins[b] is None or h < mins[b]:
+            mins[b] = h
+    result = []
+    for b in range(bins):
+        distance = 0
+        while mins[(b + distance) % bins] is None:
+            distance += 1
+        result.append(mins[(b + distance) % bins] + distance * BIN_SPAN)
+    return result
+
+
+def similarity(a, b):
+    # Estimated Jaccard similarity of the two files' shingles
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def lsh_shape(threshold, bins=NUM_BINS):
+    """
+    (bands, rows) with the most rows per band, i.e. the fewest chance
+    collisions, that still puts MIN_RECALL of the pairs at the threshold
+    in a shared bucket.
+    """
+    for rows in range(bins, 0, -1):
+        bands = bins // rows
+        if 1 - (1 - threshold ** rows) ** bands >= MIN_RECALL:
+            return bands, rows
+    return bins, 1
+
+
+def clusters(signatures, threshold):
+    """
+    Groups of indices of near-duplicate signatures, each in ascending
+    order. A file is only compared with the first file of each of its LSH
+    buckets, so the work stays linear in the number of files; groups are
+    the connected components of those links.
+    """
+    bands, rows = lsh_shape(threshold)
+    parent = list(range(len(signatures)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for i, sig in enumerate(signatures):
+        if sig is None:
+            continue
+        for band in range(bands):
+            first = buckets.setdefault((band, tuple(sig[band * rows:(band + 1) * rows])), i)
+            if first != i and root(first) != root(i) and similarity(signatures[first], sig) >= threshold:
+                parent[root(i)] = root(first)
+    groups = {}
+    for i in range(len(signatures)):
+        groups.setdefault(root(i), []).append(i)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def sink_lines(file_content):
+    """
+    1-based lines that take part in a possible sink call: the evidence of
+    the sink_rules candidates and every write-like method call.
+    """
+    masked = mask_source(file_content)
+    lines = set()
+    for candidate in find_candidates(file_content, masked):
+        lines.update(range(candidate['start_line'], candidate['end_line'] + 1))
+    for match in METHOD_CALL.finditer(masked):
+        if not SUSPECT_METHOD.match(match.group(1)):
+            continue
+        paren = skip_generics(masked, match.end()) if masked[match.end()] == '<' else match.end()
+        end = chain_end(masked, paren) if paren > 0 else match.end()
+        lines.update(range(line_of(file_content, match.start()), line_of(file_content, end) + 1))
+    return lines
+
+
+def touches_sinks(representative, member):
+    """
+    True when the files import different modules, or when a line that
+    differs between them is part of a possible sink call in either file.
+    """
+    if imported_modules(representative) != imported_modules(member):
+        return True
+    a = representative.splitlines()
+    b = member.splitlines()
+    matcher = difflib.SequenceMatcher(None, [line.strip() for line in a], [line.strip() for line in b], autojunk=False)
+    changes = [opcode for opcode in matcher.get_opcodes() if opcode[0] != 'equal']
+    if not changes:
+        return False
+    representative_lines = sink_lines(representative)
+    member_lines = sink_lines(member)
+    for _, i1, i2, j1, j2 in changes:
+        if representative_lines.intersection(range(i1 + 1, i2 + 1)) or member_lines.intersection(range(j1 + 1, j2 + 1)):
+            return True
+    return False
+
+
+def find_duplicates(jobs, threshold=0.85):
+    """
+    Split (file, content) jobs into the jobs to send and the near
+    duplicates that can reuse a result: {representative filename: [(file,
+    content, similarity), ...]}. The first file of a cluster represents it.
+    Members below the threshold against the representative itself, and
+    members that differ in sink code, stay in the jobs; the filenames of
+    the latter are the third value.
+    """
+    signatures = [signature(shingles(file_content)) for _, file_content in jobs]
+    duplicates = {}
+    reused = set()
+    reverified = []
+    for group in clusters(signatures, threshold):
+        representative, representative_content = jobs[group[0]]
+        for i in group[1:]:
+            file_name, file_content = jobs[i]
+            score = similarity(signatures[group[0]], signatures[i])
+            if score < threshold:
+                continue
+            if touches_sinks(representative_content, file_content):
+                reverified.append(file_name['filename'])
+                continue
+            duplicates.setdefault(representative['filename'], []).append((file_name, file_content, score))
+            reused.add(i)
+    return [job for i, job in enumerate(jobs) if i not in reused], duplicates, reverified
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the near-duplicate files of sink_files.json")
+    parser.add_argument("files", nargs='?', default="sink_files.json")
+    parser.add_argument("--source", default=os.getenv("SOURCE_ROOT", "/home/suchitg/DataCare"),
+                        help="directory, REPO@REVISION or archive, as for ext_service.py")
+    parser.add_argument("--source-prefix", default="twenty/")
+    parser.add_argument("--threshold", type=float, default=0.85, help="minimum estimated Jaccard similarity")
+    args = parser.parse_args()
+
+    with open(args.files, 'r') as f:
+        file_info = json.load(f)
+    source = open_source(args.source, args.source_prefix)
+    jobs = [(file_name, file_content) for file_name, (_, file_content)
+            in zip(file_info, source.read_many([file_name['filename'] for file_name in file_info]))
+            if file_content is not None]
+    source.close()
+    remaining, duplicates, reverified = find_duplicates(jobs, args.threshold)
+    for representative, members in duplicates.items():
+        print(representative)
+        for file_name, _, score in members:
+            print(f"  {score:.2f}  {file_name['filename']}")
+    print(f"{sum(len(members) for members in duplicates.values())} of {len(jobs)} files can reuse the result of "
+          f"one of {len(duplicates)} representatives; {len(reverified)} near duplicates differ in sink code")
+    for filename in reverified:
+        print(f"  re-verify: {filename}")
+
+
+if __name__ == "__main__":
+    main()
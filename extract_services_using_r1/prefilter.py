@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import json
+import re
+
+# import x from 'm', import 'm', export { x } from 'm', require('m'), import('m')
+IMPORT_SPECIFIER = re.compile(
+    r'''(?:\bfrom\s*|\bimport\s*|\brequire\s*\(\s*|\bimport\s*\(\s*)['"]([^'"\n]+)['"]'''
+)
+# Never listed in package.json, so always kept
+NODE_BUILTINS = {'fs', 'http', 'https', 'http2', 'net', 'tls', 'dgram', 'child_process'}
+
+
+def load_sink_libraries(path='sink_libraries.txt'):
+    libraries = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                libraries.append(line)
+    return libraries
+
+
+def load_dependencies(package_json_paths):
+    """
+    Union of every kind of dependency declared in the given package.json files.
+    """
+    dependencies = set()
+    for path in package_json_paths:
+        with open(path, 'r') as f:
+            package = json.load(f)
+        for key in ('dependencies', 'devDependencies', 'peerDependencies', 'optionalDependencies'):
+            dependencies.update(package.get(key, {}))
+    return dependencies
+
+
+def package_name(specifier):
+    if specifier.startswith('node:'):
+        specifier = specifier[len('node:'):]
+    parts = specifier.split('/')
+    return '/'.join(parts[:2]) if specifier.startswith('@') else parts[0]
+
+
+def imported_modules(file_content):
+    return set(IMPORT_SPECIFIER.findall(file_content))
+
+
+def is_sink_library(specifier, libraries):
+    name = package_name(specifier)
+    for library in libraries:
+        if name.startswith(library) if library.endswith('/') else name == package_name(library):
+            return True
+    return False
+
+
+def select_sink_libraries(libraries, dependencies=None):
+    """
+    Keep the configured libraries that the project actually depends on. Node
+    built-ins (fs, http, ...) are never listed in package.json and always stay.
+    """
+    if dependencies is None:
+        return libraries
+    selected = []
+    for library in libraries:
+        name = package_name(library)
+        if library.endswith('/'):
+            if any(dep.startswith(library) for dep in dependencies):
+                selected.append(library)
+        elif name in NODE_BUILTINS or name in dependencies:
+            selected.append(library)
+    return selected
+
+
+def sink_imports(file_content, libraries):
+    return sorted(spec for spec in imported_modules(file_content) if is_sink_library(spec, libraries))
+
+
+def prefilter(jobs, libraries, reaches=None):
+    """
+    Split (file, content) jobs into files that import at least one
+    sink-capable library and files that cannot reach one. `reaches`, if
+    given, also keeps files that reach one through local imports.
+    """
+    kept = []
+    skipped = []
+    for file_name, file_content in jobs:
+        if sink_imports(file_content, libraries) or (reaches and reaches(file_name['filename'])):
+            kept.append((file_name, file_content))
+        else:
+            skipped.append(file_name['filename'])
+    return kept, skipped
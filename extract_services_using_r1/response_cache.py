@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import sqlite3
+import time
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw completions keyed on the full request payload, i.e.
+    the rendered prompt plus model, temperature, top_p, top_k, max_tokens, ...
+    Changing the file, the instructions template or any sampling parameter
+    produces a different key, so stale completions are never returned.
+    """
+
+    def __init__(self, path, max_bytes=None, max_age=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                completion TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed_at)")
+        self.conn.commit()
+        self.evict()
+
+    @staticmethod
+    def key(payload):
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, payload):
+        key = self.key(payload)
+        row = self.conn.execute("SELECT completion, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.max_age is not None and time.time() - row[1] > self.max_age):
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, payload, completion):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO completions (key, model, completion, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key(payload), payload.get("model"), completion, len(completion.encode("utf-8")), now, now)
+        )
+        self.conn.commit()
+
+    def evict(self):
+        """
+        Drop entries older than max_age seconds, then the least recently used
+        entries until the cache fits in max_bytes.
+        """
+        if self.max_age is not None:
+            self.conn.execute("DELETE FROM completions WHERE created_at < ?", (time.time() - self.max_age,))
+        if self.max_bytes is not None:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self.conn.execute("SELECT key, size FROM completions ORDER BY accessed_at").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self.conn.executemany("DELETE FROM completions WHERE key = ?", stale)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
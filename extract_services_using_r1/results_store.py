@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import sqlite3
+
+from json_output import write_json_array
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    content_hash TEXT,
+    message TEXT,
+    extra TEXT,
+    UNIQUE (run_id, filename)
+);
+CREATE INDEX IF NOT EXISTS files_filename ON files (filename);
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    service TEXT,
+    evidence TEXT,
+    reasoning TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS services_service ON services (service);
+CREATE INDEX IF NOT EXISTS services_file ON services (file_id);
+CREATE TABLE IF NOT EXISTS reasoning_traces (
+    file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
+    reasoning TEXT
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS services_fts USING fts5(
+    service, evidence, reasoning, content='services', content_rowid='id'
+);
+"""
+
+FILE_KEYS = ('filename', 'content_hash', 'message', 'reasoning')
+SERVICE_KEYS = ('service', 'evidence', 'reasoning')
+
+
+def dump_extra(item, known_keys):
+    extra = {key: value for key, value in item.items() if key not in known_keys}
+    return json.dumps(extra) if extra else None
+
+
+class ResultsStore:
+    """
+    SQLite home for extraction results. Files, detected services and the
+    raw R1 reasoning traces live in separate tables, so service and
+    filename queries never touch the multi-kilobyte traces. Several runs
+    (e.g. service_extraction.json and service_extraction_old.json) can be
+    kept side by side. Services get an FTS5 index when SQLite has it.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def run_id(self, run=None):
+        if run is None:
+            row = self.conn.execute("SELECT id FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+        else:
+            row = self.conn.execute("SELECT id FROM runs WHERE name = ?", (run,)).fetchone()
+        if row is None:
+            raise KeyError(f"No run named {run!r}" if run else "The store has no runs")
+        return row[0]
+
+    def runs(self):
+        return self.conn.execute(
+            "SELECT runs.name, runs.source, COUNT(files.id) FROM runs LEFT JOIN files ON files.run_id = runs.id "
+            "GROUP BY runs.id ORDER BY runs.id"
+        ).fetchall()
+
+    # --- import / export --------------------------------------------------
+
+    def import_records(self, records, run, source=None):
+        """
+        Replace run `run` with the given records (dicts in the
+        service_extraction.json format). Returns the number of files.
+        """
+        with self.conn:
+            old = self.conn.execute("SELECT id FROM runs WHERE name = ?", (run,)).fetchone()
+            if old:
+                if self.has_fts:
+                    self.conn.execute(
+                        "INSERT INTO services_fts (services_fts, rowid, service, evidence, reasoning) "
+                        "SELECT 'delete', services.id, services.service, services.evidence, services.reasoning "
+                        "FROM services JOIN files ON files.id = services.file_id WHERE files.run_id = ?", (old[0],)
+                    )
+                self.conn.execute("DELETE FROM runs WHERE id = ?", (old[0],))
+            run_id = self.conn.execute("INSERT INTO runs (name, source) VALUES (?, ?)", (run, source)).lastrowid
+            count = 0
+            for position, item in enumerate(records):
+                message = item.get('message') or {}
+                file_id = self.conn.execute(
+                    "INSERT INTO files (run_id, position, filename, content_hash, message, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, position, item['filename'], item.get('content_hash'),
+                     # the services themselves live in their own table
+                     json.dumps({key: None if key == 'detected_data_sink_services' else value for key, value in message.items()}),
+                     dump_extra(item, FILE_KEYS))
+                ).lastrowid
+                for service_position, service_data in enumerate(message.get('detected_data_sink_services', [])):
+                    service_id = self.conn.execute(
+                        "INSERT INTO services (file_id, position, service, evidence, reasoning, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                        (file_id, service_position, service_data.get('service'), service_data.get('evidence'),
+                         service_data.get('reasoning'), dump_extra(service_data, SERVICE_KEYS))
+                    ).lastrowid
+                    if self.has_fts:
+                        self.conn.execute(
+                            "INSERT INTO services_fts (rowid, service, evidence, reasoning) VALUES (?, ?, ?, ?)",
+                            (service_id, service_data.get('service'), service_data.get('evidence'), service_data.get('reasoning'))
+                        )
+                if 'reasoning' in item:
+                    self.conn.execute("INSERT INTO reasoning_traces (file_id, reasoning) VALUES (?, ?)", (file_id, item['reasoning']))
+                count += 1
+        return count
+
+    def import_json(self, json_path, run=None):
+        with open(json_path, 'r') as f:
+            records = json.load(f)
+        return self.import_records(records, run or json_path, source=json_path)
+
+    def iter_records(self, run=None, with_reasoning=True):
+        """
+        Yield the records of a run in their original order and format.
+        """
+        run_id = self.run_id(run)
+        files = self.conn.execute(
+            "SELECT id, filename, content_hash, message, extra FROM files WHERE run_id = ? ORDER BY position", (run_id,)
+        )
+        for file_id, filename, content_hash, message, extra in files:
+            services = []
+            for service, evidence, reasoning, service_extra in self.conn.execute(
+                "SELECT service, evidence, reasoning, extra FROM services WHERE file_id = ? ORDER BY position", (file_id,)
+            ):
+                service_data = {'service': service, 'evidence': evidence, 'reasoning': reasoning}
+                service_data.update(json.loads(service_extra) if service_extra else {})
+                services.append(service_data)
+            message = json.loads(message)
+            if 'detected_data_sink_services' in message:
+                message['detected_data_sink_services'] = services
+
+            record = {'filename': filename}
+            if content_hash is not None:
+                record['content_hash'] = content_hash
+            record.update(json.loads(extra) if extra else {})
+            record['message'] = message
+            if with_reasoning:
+                row = self.conn.execute("SELECT reasoning FROM reasoning_traces WHERE file_id = ?", (file_id,)).fetchone()
+                if row is not None:
+                    record['reasoning'] = row[0]
+            yield record
+
+    def export_json(self, json_path, run=None, with_reasoning=True):
+        return write_json_array(self.iter_records(run, with_reasoning), json_path)
+
+    # --- queries ----------------------------------------------------------
+
+    def files_using(self, service, run=None):
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT files.filename FROM services JOIN files ON files.id = services.file_id "
+            "WHERE services.service = ? AND files.run_id = ? ORDER BY files.position", (service, self.run_id(run))
+        )]
+
+    def services_in(self, filename, run=None):
+        return self.conn.execute(
+            "SELECT services.service, services.evidence FROM services JOIN files ON files.id = services.file_id "
+            "WHERE files.filename = ? AND files.run_id = ? ORDER BY services.position", (filename, self.run_id(run))
+        ).fetchall()
+
+    def service_counts(self, run=None):
+        return self.conn.execute(
+            "SELECT services.service, COUNT(*) FROM services JOIN files ON files.id = services.file_id "
+            "WHERE files.run_id = ? GROUP BY services.service ORDER BY COUNT(*) DESC, services.service", (self.run_id(run),)
+        ).fetchall()
+
+    def search(self, query, run=None, limit=50):
+        """
+        Full-text search over service names, evidence and reasoning, for
+        all the words of the query. Falls back to LIKE when SQLite was built
+        without FTS5.
+        """
+        run_id = self.run_id(run)
+        if self.has_fts and query.split():
+            # Each word as a quoted phrase, so - " : * ( are not FTS5 syntax
+            query = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+            return self.conn.execute(
+                "SELECT files.filename, services.service, services.evidence FROM services_fts "
+                "JOIN services ON services.id = services_fts.rowid JOIN files ON files.id = services.file_id "
+                "WHERE services_fts MATCH ? AND files.run_id = ? ORDER BY rank LIMIT ?", (query, run_id, limit)
+            ).fetchall()
+        pattern = f"%{query}%"
+        return self.conn.execute(
+            "SELECT files.filename, services.service, services.evidence FROM services JOIN files ON files.id = services.file_id "
+            "WHERE files.run_id = ? AND (services.service LIKE ? OR services.evidence LIKE ? OR services.reasoning LIKE ?) LIMIT ?",
+            (run_id, pattern, pattern, pattern, limit)
+        ).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite store for service extraction results")
+    parser.add_argument("--db", default="service_extraction.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import a service_extraction.json file as a run")
+    import_parser.add_argument("json_path")
+    import_parser.add_argument("--run", default=None, help="run name, defaults to the file name")
+
+    export_parser = commands.add_parser("export", help="export a run back to service_extraction.json format")
+    export_parser.add_argument("json_path")
+    export_parser.add_argument("--run", default=None, help="defaults to the latest run")
+    export_parser.add_argument("--no-reasoning", action="store_true", help="leave out the R1 reasoning traces")
+
+    commands.add_parser("runs", help="list runs")
+
+    query_parser = commands.add_parser("files", help="files using a service")
+    query_parser.add_argument("service")
+    query_parser.add_argument("--run", default=None)
+
+    counts_parser = commands.add_parser("counts", help="service occurrence counts")
+    counts_parser.add_argument("--run", default=None)
+
+    search_parser = commands.add_parser("search", help="full-text search over services, evidence and reasoning")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--run", default=None)
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    if args.command == "import":
+        count = store.import_json(args.json_path, args.run)
+        print(f"Imported {count} files from {args.json_path}")
+    elif args.command == "export":
+        count = store.export_json(args.json_path, args.run, with_reasoning=not args.no_reasoning)
+        print(f"Exported {count} files to {args.json_path}")
+    elif args.command == "runs":
+        for name, source, count in store.runs():
+            print(f"{name}: {count} files ({source})")
+    elif args.command == "files":
+        for filename in store.files_using(args.service, args.run):
+            print(filename)
+    elif args.command == "counts":
+        for service, count in store.service_counts(args.run):
+            print(f"{service}: {count}")
+    elif args.command == "search":
+        for filename, service, evidence in store.search(args.query, args.run):
+            print(f"{filename}: {service}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+
+from chunking import normalize_evidence
+
+
+def iter_json_array(path, chunk_size=1 << 20):
+    """
+    Yield the elements of a top-level JSON array one at a time without
+    loading the whole file. JSONL files (one record per line) work too.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buf = f.read(chunk_size)
+        pos = len(buf) - len(buf.lstrip())
+        in_array = buf[pos:pos + 1] == '['
+        if in_array:
+            pos += 1
+        eof = False
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ',')):
+                pos += 1
+            if pos == len(buf):
+                if eof:
+                    return
+                buf = f.read(chunk_size)
+                pos = 0
+                eof = not buf
+                continue
+            if in_array and buf[pos] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The record continues past the buffer; read more of it
+                more = f.read(chunk_size)
+                eof = not more
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield record
+            pos = end
+
+
+def service_key(filename, service, evidence):
+    text = f"{filename}\0{service}\0{normalize_evidence(evidence or '')}"
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def partition_of(filename, partitions):
+    return int(hashlib.blake2b(filename.encode('utf-8'), digest_size=4).hexdigest(), 16) % partitions
+
+
+def partition_run(path, directory, side, partitions):
+    """
+    Stream a run into `partitions` spill files by hash of filename, one
+    line per file: [filename, [[key, service], ...]]. Every file of a run
+    lands in the same partition for both runs, so partitions can be
+    diffed independently with only one partition in memory.
+    """
+    outputs = [open(os.path.join(directory, f"{side}-{i}.jsonl"), 'w') for i in range(partitions)]
+    count = 0
+    try:
+        for item in iter_json_array(path):
+            filename = item['filename']
+            services = (item.get('message') or {}).get('detected_data_sink_services', [])
+            keys = [[service_key(filename, s.get('service'), s.get('evidence')), s.get('service')] for s in services]
+            outputs[partition_of(filename, partitions)].write(json.dumps([filename, keys]) + '\n')
+            count += 1
+    finally:
+        for output in outputs:
+            output.close()
+    return count
+
+
+def load_partition(path):
+    """
+    {filename: (Counter of service keys, {key: service})}; a record repeated
+    in a file is counted, not merged.
+    """
+    files = {}
+    with open(path, 'r') as f:
+        for line in f:
+            filename, keys = json.loads(line)
+            files[filename] = (Counter(key for key, _ in keys), dict(keys))
+    return files
+
+
+def diff_files(old_files, new_files):
+    """
+    Yield one diff per filename present in either run that has any change.
+    Records are diffed by occurrence count, so a service whose record goes
+    from one to three occurrences is added twice. A service name that is
+    both added and removed for the same file is reported as changed (same
+    service, different evidence).
+    """
+    for filename in sorted(old_files.keys() | new_files.keys()):
+        old = old_files.get(filename)
+        new = new_files.get(filename)
+        old_counts, old_services = old or (Counter(), {})
+        new_counts, new_services = new or (Counter(), {})
+        added = Counter()
+        for key, count in (new_counts - old_counts).items():
+            added[new_services[key]] += count
+        removed = Counter()
+        for key, count in (old_counts - new_counts).items():
+            removed[old_services[key]] += count
+        changed = Counter()
+        for service in added.keys() & removed.keys():
+            n = min(added[service], removed[service])
+            changed[service] = n
+            added[service] -= n
+            removed[service] -= n
+        if old is None or new is None or added or removed or changed:
+            yield {
+                'filename': filename,
+                'status': 'added' if old is None else 'removed' if new is None else 'changed',
+                'added': sorted((+added).elements()),
+                'removed': sorted((+removed).elements()),
+                'changed': sorted((+changed).elements()),
+            }
+
+
+def diff_runs(old_path, new_path, partitions=16, on_diff=None):
+    """
+    Compare two runs by filename and (filename, service, normalized
+    evidence) hash keys. Cost is linear in the size of both runs and memory
+    is bounded by the largest partition. Returns aggregate counts.
+    """
+    totals = {'old_files': 0, 'new_files': 0, 'files_added': 0, 'files_removed': 0, 'files_changed': 0,
+              'services_added': 0, 'services_removed': 0, 'services_changed': 0}
+    by_service = {}
+    with tempfile.TemporaryDirectory(prefix='run_diff_') as directory:
+        totals['old_files'] = partition_run(old_path, directory, 'old', partitions)
+        totals['new_files'] = partition_run(new_path, directory, 'new', partitions)
+        for i in range(partitions):
+            old_files = load_partition(os.path.join(directory, f"old-{i}.jsonl"))
+            new_files = load_partition(os.path.join(directory, f"new-{i}.jsonl"))
+            for diff in diff_files(old_files, new_files):
+                totals[f"files_{diff['status']}"] += 1
+                for kind in ('added', 'removed', 'changed'):
+                    totals[f"services_{kind}"] += len(diff[kind])
+                    for service in diff[kind]:
+                        by_service.setdefault(service, Counter())[kind] += 1
+                if on_diff:
+                    on_diff(diff)
+    return totals, by_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two service extraction runs")
+    parser.add_argument("old", nargs='?', default="service_extraction_old.json")
+    parser.add_argument("new", nargs='?', default="service_extraction.json")
+    parser.add_argument("--details", default=None, help="write one JSON line per changed file to this file")
+    parser.add_argument("--partitions", type=int, default=16, help="spill partitions; more means less memory")
+    parser.add_argument("--top", type=int, default=20, help="services with the most changes to list")
+    args = parser.parse_args()
+
+    details = open(args.details, 'w') if args.details else None
+    on_diff = (lambda diff: details.write(json.dumps(diff) + '\n')) if details else None
+    totals, by_service = diff_runs(args.old, args.new, args.partitions, on_diff)
+    if details:
+        details.close()
+
+    print(f"Files: {totals['old_files']} -> {totals['new_files']} "
+          f"(+{totals['files_added']} added, -{totals['files_removed']} removed, {totals['files_changed']} changed)")
+    print(f"Services: +{totals['services_added']} added, -{totals['services_removed']} removed, "
+          f"{totals['services_changed']} with changed evidence")
+    print("-" * 40)
+    ranked = sorted(by_service.items(), key=lambda entry: -sum(entry[1].values()))
+    for service, counts in ranked[:args.top]:
+        print(f"{service}: +{counts['added']} -{counts['removed']} ~{counts['changed']}")
+    if args.details:
+        print(f"Per-file differences written to {args.details}")
+
+
+if __name__ == "__main__":
+    main()
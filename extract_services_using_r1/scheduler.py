@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RequestFailed(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    Budget of `per_minute` units refilled continuously. acquire() waits until
+    there is room; charge() books usage only known afterwards and may push
+    the level below zero, which delays later callers.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount):
+        async with self.lock:
+            needed = min(amount, self.capacity)
+            while True:
+                self.refill()
+                if self.level >= needed:
+                    self.level -= amount
+                    return
+                await asyncio.sleep((needed - self.level) / self.rate)
+
+    def charge(self, amount):
+        self.refill()
+        self.level -= amount
+
+
+def retry_after(response):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """
+    Paces requests against requests/minute and tokens/minute budgets and
+    retries 429s, 5xxs, timeouts and connection errors with jittered
+    exponential backoff, honoring Retry-After. Gives up with RequestFailed
+    instead of letting a bad response surface as a KeyError further down.
+    """
+
+    def __init__(self, client, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=5, timeout=600, base_delay=1.0, max_delay=60.0):
+        self.client = client
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def post(self, url, payload, estimated_tokens=0, timing=None, read=None):
+        """
+        POST payload and return the decoded JSON result. `read`, when given,
+        is an async function consuming a successful response (e.g. an event
+        stream) whose result is returned instead; transport errors while it
+        reads are retried like any other. `timing`, when given, is filled in
+        with the number of attempts and the first byte time and
+        request/response sizes of the last attempt.
+        """
+        timing = {} if timing is None else timing
+        for attempt in range(self.max_retries + 1):
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens:
+                await self.tokens.acquire(estimated_tokens)
+            timing["attempts"] = attempt + 1
+            try:
+                async with self.client.stream("POST", url, json=payload, timeout=self.timeout) as response:
+                    timing["first_byte"] = time.time()
+                    if response.status_code == 200 and read:
+                        result = await read(response)
+                    else:
+                        await response.aread()
+                        if response.status_code == 200:
+                            result = response.json()
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                error = f"{type(e).__name__}: {e}"
+                delay = self.backoff(attempt)
+            else:
+                timing["request_bytes"] = len(response.request.content)
+                timing["response_bytes"] = response.num_bytes_downloaded
+                if response.status_code == 200:
+                    if self.tokens:
+                        self.tokens.charge((result.get("usage") or {}).get("completion_tokens", 0))
+                    return result
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in RETRY_STATUS:
+                    raise RequestFailed(error)
+                delay = retry_after(response)
+                if delay is None:
+                    delay = self.backoff(attempt)
+            if attempt == self.max_retries:
+                break
+            self.retries += 1
+            print(f"Retrying in {delay:.1f}s after {error}")
+            await asyncio.sleep(delay)
+        raise RequestFailed(f"giving up after {self.max_retries + 1} attempts, last error {error}")
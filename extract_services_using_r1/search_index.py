@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import re
+
+CAMEL_PART = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+
+
+def tokenize(text):
+    """
+    Lowercased identifiers and words, plus every camelCase suffix of each
+    identifier so that prefix lookups for "datasource" or "source" find
+    workspaceDataSource.
+    """
+    tokens = set()
+    for word in re.findall(r'[A-Za-z0-9_$]+', text):
+        tokens.add(word.lower())
+        parts = CAMEL_PART.findall(word)
+        for i in range(1, len(parts)):
+            tokens.add("".join(parts[i:]).lower())
+    return tokens
+
+
+def searchable_text(item):
+    services = item.get("message", {}).get("detected_data_sink_services", [])
+    fields = [item.get("filename", "")]
+    for service_data in services:
+        fields += [service_data.get("service", ""), service_data.get("evidence", ""), service_data.get("reasoning", "")]
+    return "\n".join(fields)
+
+
+def build_search_index(data, state_path=None):
+    """
+    Build the index shipped with the report:
+      vocab          sorted tokens, so the page can prefix-match by binary search
+      postings       file ids per vocab entry
+      services       lowercased service name -> file ids
+      serviceCounts  [service, occurrences], most frequent first
+    File ids are positions in `data`. Per-file tokens are kept in state_path,
+    keyed on a hash of the file's searchable text, so regenerating after an
+    incremental extraction only re-tokenizes the files that changed.
+    """
+    state = {}
+    if state_path and os.path.exists(state_path):
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+
+    new_state = {}
+    postings = {}
+    services = {}
+    service_counts = {}
+    retokenized = 0
+    for file_id, item in enumerate(data):
+        text = searchable_text(item)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        filename = item.get("filename", "")
+        entry = state.get(filename)
+        if entry is None or entry["hash"] != digest:
+            entry = {"hash": digest, "tokens": sorted(tokenize(text))}
+            retokenized += 1
+        new_state[filename] = entry
+        for token in entry["tokens"]:
+            postings.setdefault(token, []).append(file_id)
+
+        for service_data in item.get("message", {}).get("detected_data_sink_services", []):
+            service_name = service_data.get("service", "Unknown")
+            service_counts[service_name] = service_counts.get(service_name, 0) + 1
+            ids = services.setdefault(service_name.lower(), [])
+            if not ids or ids[-1] != file_id:
+                ids.append(file_id)
+
+    if state_path:
+        with open(state_path, 'w') as f:
+            json.dump(new_state, f)
+    print(f"Search index: {len(postings)} tokens, {retokenized} of {len(data)} files re-tokenized")
+
+    vocab = sorted(postings)
+    return {
+        "vocab": vocab,
+        "postings": [postings[token] for token in vocab],
+        "services": services,
+        "serviceCounts": sorted(service_counts.items(), key=lambda entry: (-entry[1], entry[0])),
+    }
+
+
+def dump_index(index):
+    # Safe to inline in a <script> tag
+    return json.dumps(index, separators=(",", ":")).replace("</", "<\\/")
+
+
+# Index lookups used by both report pages. searchFiles() returns the
+# matching file ids, or null for an empty query (everything matches).
+SEARCH_SCRIPT = """
+        function lowerBound(sorted, value) {
+            let lo = 0, hi = sorted.length;
+            while (lo < hi) {
+                const mid = (lo + hi) >> 1;
+                if (sorted[mid] < value) lo = mid + 1; else hi = mid;
+            }
+            return lo;
+        }
+
+        function prefixIds(prefix) {
+            const ids = new Set();
+            const vocab = SEARCH_INDEX.vocab;
+            for (let i = lowerBound(vocab, prefix); i < vocab.length && vocab[i].startsWith(prefix); i++) {
+                for (const id of SEARCH_INDEX.postings[i]) ids.add(id);
+            }
+            return ids;
+        }
+
+        function searchFiles(searchTerm, exactMatch) {
+            searchTerm = searchTerm.toLowerCase();
+            if (exactMatch) return Object.hasOwn(SEARCH_INDEX.services, searchTerm) ? SEARCH_INDEX.services[searchTerm] : [];
+            const tokens = searchTerm.match(/[a-z0-9_$]+/g);
+            if (!tokens) return null;
+            let result = null;
+            for (const token of tokens) {
+                const ids = prefixIds(token);
+                result = result === null ? ids : new Set([...result].filter(id => ids.has(id)));
+                if (!result.size) break;
+            }
+            return [...result].sort((a, b) => a - b);
+        }
+"""
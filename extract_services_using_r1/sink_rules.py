@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import re
+
+IDENT = re.compile(r'[A-Za-z_$][\w$]*')
+NUMBER = re.compile(r'[0-9][\w.]*')
+IDENT_CHARS = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$')
+# Characters after which a / starts a regex literal rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else'}
+METHOD_CALL = re.compile(r'\.\s*([A-Za-z_$][\w$]*)\s*(?=[(<])')
+WRITE_SQL = re.compile(r'\b(?:INSERT|UPDATE|DELETE|CREATE|ALTER|DROP|TRUNCATE|UPSERT|MERGE|RENAME)\b', re.IGNORECASE)
+
+REPOSITORY = r'(?:[A-Za-z_$][\w$]*Repository|repository|repo|[A-Za-z_$][\w$]*Repo)'
+ENTITY_MANAGER = r'(?:entityManager|manager|transactionManager|[A-Za-z_$][\w$]*EntityManager)'
+QUERY_RUNNER = r'(?:queryRunner|[A-Za-z_$][\w$]*QueryRunner)'
+DATA_SOURCE = r'(?:[A-Za-z_$][\w$]*DataSource|dataSource|connection)'
+
+# (name, receiver pattern, methods (set or pattern), description, predicate on the call text)
+RULES = [
+    ("typeorm-repository", REPOSITORY + '|' + ENTITY_MANAGER,
+     {'save', 'insert', 'update', 'upsert', 'delete', 'softDelete', 'remove', 'softRemove', 'restore',
+      'increment', 'decrement', 'clear', 'query'},
+     "TypeORM repository/entity manager call that writes to the database", None),
+    ("typeorm-query-runner", QUERY_RUNNER,
+     {'query', 'createTable', 'dropTable', 'addColumn', 'addColumns', 'dropColumn', 'dropColumns', 'renameColumn',
+      'changeColumn', 'createIndex', 'dropIndex', 'createForeignKey', 'dropForeignKey', 'createSchema',
+      'dropSchema', 'createPrimaryKey', 'dropPrimaryKey', 'renameTable', 'clearTable'},
+     "TypeORM query runner changing the database schema or data", None),
+    ("sql-query", DATA_SOURCE, {'query'},
+     "raw SQL statement that writes to the database", WRITE_SQL.search),
+    ("http-client", r'(?:[A-Za-z_$][\w$]*HttpService|httpService|axios|[A-Za-z_$][\w$]*HttpClient|httpClient|[A-Za-z_$][\w$]*Api|client)',
+     {'post', 'put', 'patch', 'delete', 'request'},
+     "HTTP client call sending data to an external service", None),
+    ("queue-producer", r'(?:[A-Za-z_$][\w$]*Queue(?:Service)?|queue|[A-Za-z_$][\w$]*Producer|producer|channel)',
+     {'add', 'addBulk', 'send', 'sendToQueue', 'publish', 'produce', 'enqueue', 'sendMessage'},
+     "message queue producer enqueuing data", None),
+    ("cache-write", r'(?:[A-Za-z_$][\w$]*Cache(?:Storage)?(?:Service)?|cache(?:Storage)?(?:Service)?|cacheManager|redis|[A-Za-z_$][\w$]*Redis(?:Client)?)',
+     r'set\w*|mset|hset|hSet|del\w*|lpush|rpush|lPush|rPush|incr\w*|expire|flush\w*|reset|publish|add\w*|update\w*|'
+     r'invalidate\w*|remove\w*',
+     "cache/key-value store write", None),
+    ("event-emitter", r'(?:[A-Za-z_$][\w$]*EventEmitter|eventEmitter|emitter)',
+     {'emit', 'emitAsync', 'emitDatabaseBatchEvent', 'emitCustomBatchEvent'},
+     "event emitter publishing application data to listeners", None),
+    ("logger", r'(?:logger|[A-Za-z_$][\w$]*Logger)',
+     {'log', 'error', 'warn', 'info', 'debug', 'verbose', 'fatal'},
+     "logger writing application data to the logs", None),
+    ("file-system", r'(?:fs|fsPromises|fse)',
+     {'writeFile', 'writeFileSync', 'appendFile', 'appendFileSync', 'createWriteStream', 'mkdir', 'mkdirSync',
+      'rm', 'rmSync', 'unlink', 'unlinkSync', 'rename', 'renameSync', 'copyFile', 'copyFileSync', 'outputFile',
+      'outputJson', 'writeJson'},
+     "file system write", None),
+    ("file-storage", r'(?:[A-Za-z_$][\w$]*Storage(?:Service|Driver)?|storage|s3Client|[A-Za-z_$][\w$]*S3(?:Client)?|s3)',
+     {'write', 'delete', 'move', 'copy', 'upload', 'put', 'putObject', 'send', 'deleteObject', 'deleteObjects',
+      'copyObject'},
+     "object/file storage write", None),
+]
+RULES = [(name, re.compile(rf'^(?:{receiver})$'), re.compile(methods if isinstance(methods, str) else '|'.join(methods)),
+          description, predicate)
+         for name, receiver, methods, description, predicate in RULES]
+# Wrapper properties that stand for the object they hang off
+PASSTHROUGH = {'axiosRef', 'promises'}
+
+# Calls the rules do not explain that still look like they could move data;
+# a file with any of these is not considered covered
+SUSPECT_RECEIVER = re.compile(r'(?:Service|Repository|Repo|Manager|Client|Storage|Queue|Emitter|Producer|Publisher|'
+                              r'Gateway|Api|Driver|Runner|DataSource|Provider|Sdk|Transport|Mailer|Cache)$')
+SUSPECT_METHOD = re.compile(r'^(?:save|insert|update|upsert|delete|remove|create|set|add|send|emit|publish|write|put|'
+                            r'post|patch|upload|store|log|track|execute|run|sync|enqueue|increment|decrement|flush|'
+                            r'persist|record|dispatch|notify|capture|invalidate|query)')
+# Plain function calls (or methods of window/navigator) that reach the network or a database
+SUSPECT_FUNCTIONS = {'fetch', 'sendBeacon', 'axios', 'got', 'ky', 'request', 'superagent', 'needle', 'query', 'exec',
+                     'execute', 'sql'}
+BARE_CALL = re.compile(r'(?<![\w$.@])([A-Za-z_$][\w$]*)\s*(?=\()')
+# Rules whose calls do not persist data; their candidates alone never make a file covered
+NON_COVERING_RULES = {'logger', 'event-emitter'}
+# import x from 'm', import * as x from 'm', import { a, b as c } from 'm', const x = require('m')
+IMPORT_BINDINGS = re.compile(r'''\bimport\s+(?!type\b)([\w$\s{},*]+?)\s+from\s*['"]([^'"\n]+)['"]''')
+REQUIRE_BINDINGS = re.compile(r'''\b(?:const|let|var)\s+(\{[^}]*\}|[A-Za-z_$][\w$]*)\s*=\s*require\s*\(\s*['"]([^'"\n]+)['"]''')
+# Relative imports and the repository's own path aliases are not packages
+LOCAL_SPECIFIER = re.compile(r'^(?:\.|/|src/|@/|~/)')
+# `x = new P(...)`, `x = P.create(...)`, `x: P`: x stands for the package P
+ASSIGNED = re.compile(r'\b([A-Za-z_$][\w$]*)\s*(?::[^=;\n]*)?=\s*(?:await\s+)?(?:new\s+)?([A-Za-z_$][\w$]*)')
+TYPED = re.compile(r'\b([A-Za-z_$][\w$]*)\s*\??:\s*([A-Za-z_$][\w$]*)')
+
+
+def mask_source(text):
+    """
+    Copy of `text` with the contents of comments, strings, template text
+    and regex literals blanked out (newlines kept), so that patterns only
+    match real code and offsets still point into the original.
+    """
+    out = list(text)
+    n = len(text)
+    # Brace depth at each open ${ of a template literal
+    templates = []
+    depth = 0
+    last = ''  # last significant code character or word, for regex detection
+
+    def blank(start, end):
+        for k in range(start, min(end, n)):
+            if out[k] != '\n':
+                out[k] = ' '
+
+    def template_text(i):
+        # Blank template text from i; returns the index after the closing ` or ${
+        start = i
+        while i < n:
+            if text[i] == '\\':
+                i += 2
+            elif text[i] == '`':
+                blank(start, i)
+                return i + 1, False
+            elif text.startswith('${', i):
+                blank(start, i)
+                return i + 2, True
+            else:
+                i += 1
+        blank(start, n)
+        return n, False
+
+    i = 0
+    while i < n:
+        c = text[i]
+        if c == '/' and text.startswith('//', i):
+            end = text.find('\n', i)
+            end = n if end < 0 else end
+            blank(i, end)
+            i = end
+        elif c == '/' and text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            blank(i, end)
+            i = end
+        elif c in '\'"':
+            end = i + 1
+            while end < n and text[end] != c and text[end] != '\n':
+                end += 2 if text[end] == '\\' else 1
+            blank(i + 1, end)
+            i = end + 1
+            last = c
+        elif c == '`' or (c == '}' and templates and depth - 1 == templates[-1]):
+            if c == '}':
+                depth -= 1
+                templates.pop()
+            i, opened = template_text(i + 1)
+            if opened:
+                templates.append(depth)
+                depth += 1
+            last = '`'
+        elif c == '/' and (last in REGEX_PRECEDERS or last in REGEX_KEYWORDS or last == ''):
+            end = i + 1
+            in_class = False
+            while end < n and text[end] != '\n':
+                if text[end] == '\\':
+                    end += 2
+                    continue
+                if text[end] == '[':
+                    in_class = True
+                elif text[end] == ']':
+                    in_class = False
+                elif text[end] == '/' and not in_class:
+                    break
+                end += 1
+            blank(i + 1, end)
+            i = end + 1
+            last = ')'
+        elif c in IDENT_CHARS:
+            match = IDENT.match(text, i) or NUMBER.match(text, i)
+            last = match.group(0)
+            i = match.end()
+        else:
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+            if not c.isspace():
+                last = c
+            i += 1
+    return "".join(out)
+
+
+def matching(masked, i, step):
+    """
+    Index of the bracket matching the one at i, scanning forward (step 1)
+    or backward (step -1); -1 when unbalanced.
+    """
+    pairs = {'(': ')', '[': ']', '{': '}', ')': '(', ']': '[', '}': '{'}
+    opener = masked[i]
+    closer = pairs[opener]
+    level = 0
+    while 0 <= i < len(masked):
+        if masked[i] == opener:
+            level += 1
+        elif masked[i] == closer:
+            level -= 1
+            if level == 0:
+                return i
+        i += step
+    return -1
+
+
+def skip_generics(masked, i):
+    # i at '<' after a method name: skip balanced type arguments if followed by '('
+    level = 0
+    j = i
+    while j < len(masked):
+        if masked[j] == '<':
+            level += 1
+        elif masked[j] == '>':
+            level -= 1
+            if level == 0:
+                k = j + 1
+                while k < len(masked) and masked[k].isspace():
+                    k += 1
+                return k if k < len(masked) and masked[k] == '(' else -1
+        elif masked[j] in ';{}':
+            return -1
+        j += 1
+    return -1
+
+
+def chain_segments(masked, dot):
+    """
+    Walk back from the '.' before a method to the start of its call chain.
+    Returns the start offset and the chain's segments before the method as
+    (name, is_call) pairs, outermost first.
+    """
+    segments = []
+    i = dot
+    while True:
+        j = i - 1
+        while j >= 0 and masked[j].isspace():
+            j -= 1
+        if j < 0:
+            break
+        if masked[j] == '!':  # non-null assertion
+            j -= 1
+        if masked[j] in ')]':
+            open_index = matching(masked, j, -1)
+            if open_index < 0:
+                break
+            k = open_index - 1
+            while k >= 0 and masked[k].isspace():
+                k -= 1
+            if k >= 0 and masked[k] in IDENT_CHARS and masked[j] == ')':
+                end = k + 1
+                while k >= 0 and masked[k] in IDENT_CHARS:
+                    k -= 1
+                segments.append((masked[k + 1:end], True))
+                i = k + 1
+            elif k >= 0 and masked[k] == '>' and masked[j] == ')':
+                break  # generic call inside the chain, stop here
+            else:
+                if masked[j] == ')':
+                    segments.append((None, True))
+                i = open_index
+                if masked[j] == ']':
+                    continue
+                break
+        elif masked[j] in IDENT_CHARS:
+            end = j + 1
+            while j >= 0 and masked[j] in IDENT_CHARS:
+                j -= 1
+            segments.append((masked[j + 1:end], False))
+            i = j + 1
+        else:
+            break
+        # continue through '.' or '?.'
+        k = i - 1
+        while k >= 0 and masked[k].isspace():
+            k -= 1
+        if k >= 0 and masked[k] == '.':
+            i = k - 1 if k > 0 and masked[k - 1] == '?' else k
+            continue
+        break
+    segments.reverse()
+    return i, segments
+
+
+def chain_end(masked, i):
+    """
+    From an opening '(' of a call, the end of the whole call chain.
+    """
+    while True:
+        close = matching(masked, i, 1)
+        if close < 0:
+            return len(masked)
+        end = close + 1
+        j = end
+        while j < len(masked) and masked[j].isspace():
+            j += 1
+        if masked.startswith('?.', j):
+            j += 1
+        if j < len(masked) and masked[j] == '.':
+            match = re.compile(r'\.\s*[A-Za-z_$][\w$]*\s*').match(masked, j)
+            if match:
+                k = match.end()
+                if k < len(masked) and masked[k] == '<':
+                    k = skip_generics(masked, k)
+                if k > 0 and k < len(masked) and masked[k] == '(':
+                    i = k
+                    continue
+                return match.end()
+        return end
+
+
+def receiver_name(segments):
+    # The nearest plain identifier before the method, skipping calls and `this`
+    for name, is_call in reversed(segments):
+        if name and not is_call and name != 'this' and name not in PASSTHROUGH:
+            return name
+    return None
+
+
+def line_of(text, offset):
+    return text.count('\n', 0, offset) + 1
+
+
+def rule_calls(text, masked):
+    """
+    Sink calls recognised by RULES, with the offsets of their evidence and
+    the offset where their call chain ends, which identifies the chain.
+    Each call chain is reported once; a call in the arguments of another
+    is a chain of its own.
+    """
+    calls = {}
+    for match in METHOD_CALL.finditer(masked):
+        method = match.group(1)
+        paren = match.end()
+        if masked[paren] == '<':
+            paren = skip_generics(masked, paren)
+            if paren < 0:
+                continue
+        start, segments = chain_segments(masked, match.start())
+        receiver = receiver_name(segments)
+        if receiver is None:
+            continue
+        chain_names = {name for name, _ in segments}
+        end = chain_end(masked, paren)
+        if end in calls:
+            continue
+        for name, pattern, methods, description, predicate in RULES:
+            builder = 'createQueryBuilder' in chain_names and method == 'execute' and any(
+                verb in masked[start:end] for verb in ('.insert(', '.update(', '.delete(', '.softDelete(', '.restore('))
+            if builder:
+                name, description = "typeorm-query-builder", "TypeORM query builder chain that writes to the database"
+            elif not (methods.fullmatch(method) and pattern.match(receiver)):
+                continue
+            if predicate and not predicate(text[paren:end]):
+                continue
+            if re.compile(r'await\s+$').search(masked, max(0, start - 12), start):
+                start = masked.rfind('await', 0, start)
+            root = segments[0][0] if segments and segments[0][0] != 'this' else receiver
+            service = root if builder and root else receiver
+            calls[end] = {
+                "service": service,
+                "evidence": text[start:end + 1 if masked.startswith(';', end) else end],
+                "reasoning": f"'{service}' .{method}(): {description}.",
+                "rule": name,
+                "start": start,
+                "end": end,
+            }
+            break
+    return sorted(calls.values(), key=lambda call: call["start"])
+
+
+def find_candidates(text, masked=None):
+    """
+    Sink calls recognised by RULES, in the detected_data_sink_services
+    shape plus the rule name and the 1-based lines of the exact evidence.
+    """
+    masked = masked if masked is not None else mask_source(text)
+    return [candidate(text, call) for call in rule_calls(text, masked)]
+
+
+def candidate(text, call):
+    result = {key: value for key, value in call.items() if key not in ('start', 'end')}
+    result["start_line"] = line_of(text, call["start"])
+    result["end_line"] = line_of(text, call["start"] + len(call["evidence"]))
+    return result
+
+
+def package_bindings(text, masked=None):
+    """
+    Local names that stand for a package (not one of the repository's own
+    modules): its imports, e.g. {'got', 'Stripe'}, and the variables and
+    fields made from or typed as those, e.g. `stripe = new Stripe(key)`.
+    Type-only imports are left out.
+    """
+    masked = masked if masked is not None else mask_source(text)
+    names = set()
+    for pattern in (IMPORT_BINDINGS, REQUIRE_BINDINGS):
+        for match in pattern.finditer(text):
+            if LOCAL_SPECIFIER.match(match.group(2)):
+                continue
+            for binding in re.split(r'[{},]', match.group(1)):
+                # `* as x`, `a as b`: the bound name is the last word
+                binding = binding.split()
+                if binding and binding[-1] != '*' and binding[0] != 'type':
+                    names.add(binding[-1])
+    bindings = [(match.group(1), match.group(2)) for pattern in (ASSIGNED, TYPED) for match in pattern.finditer(masked)]
+    while True:
+        derived = {name for name, source in bindings if source in names} - names
+        if not derived:
+            return names
+        names |= derived
+
+
+def find_suspects(text, chains, masked=None):
+    """
+    Calls that might move data but match no rule, other than the call
+    chains of the candidates (`chains`, the offsets where they end):
+      - write-like methods on services, repositories, clients, this.x, ...
+      - any call on a name imported from a package (prisma.user.create)
+      - plain network or database calls (fetch(...), got(...))
+    A call nested in the arguments of a candidate, or next to it on the
+    same line, is a chain of its own and still counts.
+    """
+    masked = masked if masked is not None else mask_source(text)
+    packages = package_bindings(text, masked)
+    suspects = []
+
+    def add(name, offset, paren):
+        if paren < 0 or chain_end(masked, paren) not in chains:
+            suspects.append(f"{name} (line {line_of(text, offset)})")
+
+    for match in METHOD_CALL.finditer(masked):
+        method = match.group(1)
+        paren = skip_generics(masked, match.end()) if masked[match.end()] == '<' else match.end()
+        _, segments = chain_segments(masked, match.start())
+        receiver = receiver_name(segments)
+        names = [name for name, _ in segments if name and name != 'this']
+        if names and names[0] in packages:
+            add(".".join(names + [method]), match.start(), paren)
+        elif method in SUSPECT_FUNCTIONS and names[:1] in (['window'], ['globalThis'], ['navigator']):
+            add(f"{names[0]}.{method}", match.start(), paren)
+        elif receiver is not None and SUSPECT_METHOD.match(method) and (
+                SUSPECT_RECEIVER.search(receiver) or (segments and segments[0][0] == 'this')):
+            add(f"{receiver}.{method}", match.start(), paren)
+    for match in BARE_CALL.finditer(masked):
+        name = match.group(1)
+        if (name in packages or name in SUSPECT_FUNCTIONS) and not re.search(
+                r'\bnew\s+$', masked[max(0, match.start() - 8):match.start()]):
+            add(name, match.start(), match.end())
+    return suspects
+
+
+def covered(candidates, suspects):
+    """
+    True when the rules explain the whole file: a candidate of a rule that
+    persists data, and no suspect call.
+    """
+    return not suspects and any(c["rule"] not in NON_COVERING_RULES for c in candidates)
+
+
+def extract(text):
+    """
+    Returns (candidates, suspects); covered() tells whether they are
+    enough to skip the LLM.
+    """
+    masked = mask_source(text)
+    calls = rule_calls(text, masked)
+    return [candidate(text, call) for call in calls], find_suspects(text, {call["end"] for call in calls}, masked)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local sink rules over source files")
+    parser.add_argument("files", nargs='+')
+    parser.add_argument("--json", action="store_true", help="print the candidates as JSON")
+    args = parser.parse_args()
+    for path in args.files:
+        with open(path, 'r') as f:
+            candidates, suspects = extract(f.read())
+        if args.json:
+            print(json.dumps({"filename": path, "detected_data_sink_services": candidates, "unexplained": suspects}, indent=4))
+            continue
+        print(f"{path}: {len(candidates)} candidates, {'covered' if covered(candidates, suspects) else 'needs the LLM'}")
+        for candidate in candidates:
+            print(f"  {candidate['start_line']}-{candidate['end_line']} {candidate['rule']}: {candidate['service']}")
+        for suspect in suspects:
+            print(f"  unexplained: {suspect}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import os
+import subprocess
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+ARCHIVE_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.zip')
+
+
+class DirectorySource:
+    """
+    Files under a directory, e.g. a checkout. read_many() reads ahead on a
+    thread pool so slow (network) disks are not hit one file at a time.
+    """
+
+    revision = None
+
+    def __init__(self, root, workers=16):
+        self.root = root
+        self.workers = workers
+
+    def read(self, filename):
+        with open(os.path.join(self.root, filename), 'r') as f:
+            return f.read()
+
+    def read_or_none(self, filename):
+        try:
+            return self.read(filename)
+        except FileNotFoundError:
+            return None
+
+    def read_many(self, filenames):
+        """
+        Yields (filename, content) in the given order, content None for a
+        missing file.
+        """
+        with ThreadPoolExecutor(self.workers) as pool:
+            yield from zip(filenames, pool.map(self.read_or_none, filenames))
+
+    def close(self):
+        pass
+
+
+class GitSource:
+    """
+    Files of one commit of a git repository, read without a checkout
+    through a single long-lived `git cat-file --batch` process. read_many()
+    writes all the requests from a thread while the answers are read, so a
+    whole run costs one pipelined round trip. `prefix` is stripped from the
+    filenames (sink_files.json paths start with the repository directory).
+    """
+
+    def __init__(self, repo, revision="HEAD", prefix=""):
+        self.repo = repo
+        self.prefix = prefix
+        self.revision = subprocess.run(["git", "-C", repo, "rev-parse", "--verify", f"{revision}^{{commit}}"],
+                                       check=True, capture_output=True, text=True).stdout.strip()
+        self.process = subprocess.Popen(["git", "-C", repo, "cat-file", "--batch"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.lock = threading.Lock()
+
+    def path_of(self, filename):
+        return filename[len(self.prefix):] if filename.startswith(self.prefix) else filename
+
+    def request(self, filenames):
+        for filename in filenames:
+            self.process.stdin.write(f"{self.revision}:{self.path_of(filename)}\n".encode("utf-8"))
+        self.process.stdin.flush()
+
+    def response(self):
+        # "<oid> blob <size>" followed by the content, or "<name> missing"
+        header = self.process.stdout.readline().decode("utf-8").split()
+        if len(header) != 3:
+            return None
+        data = self.process.stdout.read(int(header[2]) + 1)[:-1]
+        return data.decode("utf-8", errors="replace") if header[1] == "blob" else None
+
+    def read_many(self, filenames):
+        filenames = list(filenames)
+        with self.lock:
+            writer = threading.Thread(target=self.request, args=(filenames,))
+            writer.start()
+            try:
+                for filename in filenames:
+                    yield filename, self.response()
+            finally:
+                writer.join()
+
+    def read(self, filename):
+        content = next(self.read_many([filename]))[1]
+        if content is None:
+            raise FileNotFoundError(f"{filename} not in {self.repo} at {self.revision}")
+        return content
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class ArchiveSource:
+    """
+    Files of a .tar(.gz) or .zip archive, e.g. a GitHub source download.
+    The archive is read once, in its own order (streaming for tar), keeping
+    only the requested files; a single read() of a file not requested
+    before keeps every file of the archive. A top-level directory such as
+    `twenty-<sha>/` is ignored when matching names.
+    """
+
+    revision = None
+
+    def __init__(self, path, prefix=""):
+        self.path = path
+        self.prefix = prefix
+        self.files = {}
+        self.loaded = False
+
+    def members(self):
+        # (name, read) pairs of the regular files, in archive order
+        if self.path.endswith('.zip'):
+            with zipfile.ZipFile(self.path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        yield info.filename, lambda info=info: archive.read(info)
+            return
+        with tarfile.open(self.path, "r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, lambda member=member: archive.extractfile(member).read()
+
+    def load(self, wanted=None):
+        for name, read in self.members():
+            name = name[2:] if name.startswith('./') else name
+            candidates = [name, name.split('/', 1)[-1]]
+            if wanted is not None:
+                candidates = [candidate for candidate in candidates if candidate in wanted]
+            if candidates:
+                content = read().decode("utf-8", errors="replace")
+                for candidate in candidates:
+                    self.files[candidate] = content
+        self.loaded = self.loaded or wanted is None
+
+    def path_of(self, filename):
+        return filename[len(self.prefix):] if filename.startswith(self.prefix) else filename
+
+    def read_many(self, filenames):
+        filenames = list(filenames)
+        wanted = {self.path_of(filename) for filename in filenames} - set(self.files)
+        if wanted and not self.loaded:
+            self.load(wanted)
+        for filename in filenames:
+            yield filename, self.files.get(self.path_of(filename))
+
+    def read(self, filename):
+        if self.path_of(filename) not in self.files and not self.loaded:
+            self.load()
+        if self.path_of(filename) not in self.files:
+            raise FileNotFoundError(f"{filename} not in {self.path}")
+        return self.files[self.path_of(filename)]
+
+    def close(self):
+        self.files = {}
+
+
+def open_source(spec, prefix="twenty/"):
+    """
+    A source provider for `spec`: a .tar(.gz)/.zip archive, REPO@REVISION
+    for a commit of a git repository, or a directory. Archive and git
+    paths are relative to the repository, so `prefix` is stripped from the
+    filenames; a directory is the parent of the repository, as before.
+    """
+    if spec.endswith(ARCHIVE_EXTENSIONS):
+        return ArchiveSource(spec, prefix)
+    if '@' in spec and not os.path.isdir(spec):
+        repo, revision = spec.rsplit('@', 1)
+        return GitSource(repo, revision, prefix)
+    return DirectorySource(spec)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import time
+
+from chunking import estimate_tokens
+
+THINK_END = "</think>"
+NUMBER_PREFIX = re.compile(r'-?(0|[1-9][0-9]*)?(\.[0-9]*)?([eE][+-]?[0-9]*)?$')
+LITERALS = ("true", "false", "null")
+
+
+class ReasoningLimitExceeded(ValueError):
+    pass
+
+
+class JsonPrefixChecker:
+    """
+    Validates a JSON document as it arrives and raises ValueError at the
+    first character that cannot start or continue a valid document: a
+    leading non-bracket, a mismatched closer, a bare word that is not a
+    literal or number, a raw control character in a string, or anything
+    but whitespace after the top-level value. Comma and colon placement is
+    left to the final json.loads.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.word = ""
+        self.started = False
+        self.complete = False
+        self.offset = 0
+
+    def fail(self, char, reason):
+        raise ValueError(f"Malformed JSON answer at offset {self.offset}: {reason} ({char!r})")
+
+    def end_word(self):
+        if self.word and self.word not in LITERALS and not re.fullmatch(r'-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][+-]?[0-9]+)?', self.word):
+            self.fail(self.word, "not a literal or number")
+        self.word = ""
+
+    def feed(self, text):
+        for char in text:
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                elif char < ' ':
+                    self.fail(char, "control character in string")
+            elif char.isspace():
+                self.end_word()
+            elif self.complete:
+                self.fail(char, "trailing data after the JSON value")
+            elif not self.started:
+                if char not in '{[':
+                    self.fail(char, "expected an object or array")
+                self.started = True
+                self.stack.append(char)
+            elif char in '{[':
+                self.end_word()
+                self.stack.append(char)
+            elif char in '}]':
+                self.end_word()
+                if self.stack.pop() != {'}': '{', ']': '['}[char]:
+                    self.fail(char, "mismatched bracket")
+                self.complete = not self.stack
+            elif char in ',:':
+                self.end_word()
+            elif char == '"':
+                self.end_word()
+                self.in_string = True
+            else:
+                self.word += char
+                if not (any(literal.startswith(self.word) for literal in LITERALS) or NUMBER_PREFIX.match(self.word)):
+                    self.fail(self.word, "not a literal or number")
+            self.offset += 1
+
+
+async def iter_sse(lines):
+    """
+    Data payloads of a server-sent event stream, ending at [DONE].
+    """
+    data = []
+    async for line in lines:
+        if line.startswith("data:"):
+            data.append(line[5:].lstrip(" "))
+        elif not line and data:
+            payload = "\n".join(data)
+            data = []
+            if payload == "[DONE]":
+                return
+            yield payload
+    if data and "\n".join(data) != "[DONE]":
+        yield "\n".join(data)
+
+
+class CompletionStream:
+    """
+    Consumes a streamed chat completion. The reasoning is written to
+    `trace_path` as it arrives rather than held in memory, the </think>
+    boundary is found in the stream (also across chunk boundaries), and the
+    answer after it goes through a JsonPrefixChecker, so a runaway trace or
+    malformed answer aborts the request as soon as it is recognised. Traces
+    of aborted requests are left on disk for inspection.
+
+    read() is a RequestScheduler reader: it returns the same
+    {"choices": [...], "usage": ...} shape as a non-streaming call, with
+    the reasoning put back in front of the answer.
+    """
+
+    def __init__(self, trace_path, max_reasoning_tokens=None):
+        self.trace_path = trace_path
+        self.max_reasoning_tokens = max_reasoning_tokens
+        self.first_token = None
+        self.reasoning_end = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+        self.trace = open(self.trace_path, 'w')
+        self.pending = ""
+        self.reasoning_chars = 0
+        self.in_reasoning = True
+        self.separate_reasoning = False
+        self.answer = []
+        self.checker = JsonPrefixChecker()
+        self.first_token = None
+        self.reasoning_end = None
+
+    def write_reasoning(self, text):
+        if not self.reasoning_chars and not self.trace.tell():
+            text = text.lstrip()
+            if text.startswith("<think>"):
+                text = text[len("<think>"):]
+        self.trace.write(text)
+        self.reasoning_chars += len(text)
+        if self.max_reasoning_tokens and self.reasoning_chars // 4 > self.max_reasoning_tokens:
+            raise ReasoningLimitExceeded(
+                f"Reasoning exceeded {self.max_reasoning_tokens} tokens, trace kept in {self.trace_path}")
+
+    def write_answer(self, text):
+        if self.reasoning_end is None:
+            self.reasoning_end = time.time()
+        self.checker.feed(text)
+        self.answer.append(text)
+
+    def feed(self, text):
+        if not self.in_reasoning:
+            self.write_answer(text)
+            return
+        self.pending += text
+        end = self.pending.find(THINK_END)
+        if end >= 0:
+            self.write_reasoning(self.pending[:end])
+            self.in_reasoning = False
+            rest = self.pending[end + len(THINK_END):]
+            self.pending = ""
+            self.write_answer(rest)
+        elif len(self.pending) >= 2 * len(THINK_END):
+            # Hold back what could be the start of a </think> split across chunks
+            cut = len(self.pending) - len(THINK_END) + 1
+            self.write_reasoning(self.pending[:cut])
+            self.pending = self.pending[cut:]
+
+    async def read(self, response):
+        self.start()
+        usage = None
+        try:
+            async for data in iter_sse(response.aiter_lines()):
+                event = json.loads(data)
+                if event.get("error"):
+                    raise ValueError(f"Stream error: {event['error']}")
+                usage = event.get("usage") or usage
+                for choice in event.get("choices") or []:
+                    delta = choice.get("delta") or {}
+                    if (delta.get("reasoning_content") or delta.get("content")) and self.first_token is None:
+                        self.first_token = time.time()
+                    if delta.get("reasoning_content"):
+                        # Providers that stream the reasoning in its own field
+                        self.separate_reasoning = True
+                        self.write_reasoning(delta["reasoning_content"])
+                    if delta.get("content"):
+                        if self.separate_reasoning and self.in_reasoning:
+                            self.in_reasoning = False
+                        self.feed(delta["content"])
+            if self.in_reasoning:
+                self.write_reasoning(self.pending)
+                raise ValueError(f"Stream ended before {THINK_END}, trace kept in {self.trace_path}")
+            if not self.checker.complete:
+                raise ValueError("Stream ended inside the JSON answer")
+        finally:
+            self.trace.close()
+
+        with open(self.trace_path, 'r') as f:
+            reasoning = f.read()
+        os.remove(self.trace_path)
+        usage = usage or {}
+        usage.setdefault("completion_tokens_details", {}).setdefault(
+            "reasoning_tokens", estimate_tokens(reasoning))
+        content = f"<think>{reasoning}{THINK_END}{''.join(self.answer)}"
+        return {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import re
+from multiprocessing import Pool
+
+from import_graph import ImportGraph, load_tsconfig
+from prefilter import package_name
+from sink_rules import line_of, mask_source
+
+IDENT = re.compile(r'[A-Za-z_$][\w$]*')
+# Specifiers are read from the original text at the quote the masked match ends on
+IMPORT = re.compile(r'\bimport\s+(?:type\s+)?((?:[\w$]+\s*,?\s*)?(?:\*\s*as\s+[\w$]+|\{[^{}]*\})?)\s*from\s*([\'"])')
+IMPORT_EQUALS = re.compile(r'\bimport\s+([\w$]+)\s*=\s*require\s*\(\s*([\'"])')
+REQUIRE = re.compile(r'\b(?:const|let|var)\s+([\w$]+|\{[^{}]*\})\s*=\s*require\s*\(\s*([\'"])')
+EXPORT_FROM = re.compile(r'\bexport\s+(?:type\s+)?(\*(?:\s*as\s+[\w$]+)?|\{[^{}]*\})\s*from\s*([\'"])')
+EXPORT_LIST = re.compile(r'\bexport\s+(?:type\s+)?\{([^{}]*)\}(?!\s*from\b)')
+EXPORT_DECLARATION = re.compile(r'\bexport\s+(default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?'
+                                r'(?:class|function\s*\*?|const|let|var|enum|interface|type)\s+([\w$]+)')
+EXPORT_DEFAULT = re.compile(r'\bexport\s+default\s+(?!class\b|function\b|async\b|abstract\b)([\w$]+)\s*[;\n]')
+VARIABLE = re.compile(r'\b(?:const|let|var)\s+([\w$]+)\s*(?::\s*([\w$.]+)[^=;]*?)?=\s*(?:await\s+)?(?:new\s+)?([\w$.]+)?')
+DESTRUCTURING = re.compile(r'\b(?:const|let|var)\s+\{([^{}]*)\}\s*(?::[^=;]*)?=\s*(?:await\s+)?([\w$.]+)')
+CLASS = re.compile(r'\bclass\s+([\w$]+)(?:\s*<[^{]*?>)?(?:\s+extends\s+([\w$.]+))?')
+FUNCTION = re.compile(r'\bfunction\s*\*?\s*([\w$]+)')
+PROPERTY = re.compile(r'^[ \t]*(?:@[\w$]+\([^()\n]*\)\s*)*(?:(?:private|protected|public|readonly|static|declare|override)\s+)+'
+                      r'([\w$]+)\s*[?!]?\s*(?::\s*([\w$.]+)[^=;\n]*)?(?:=\s*(?:await\s+)?(?:new\s+)?([\w$.]+))?', re.MULTILINE)
+# Decorator arguments nest up to three levels: @Inject(forwardRef(() => FooService))
+DECORATOR_ARGUMENTS = r'\((?:[^()]|\((?:[^()]|\([^()]*\))*\))*\)'
+PARAMETER = re.compile(r'\s*((?:@[\w$]+\s*' + DECORATOR_ARGUMENTS + r'\s*)*)'
+                       r'(?:(?:private|protected|public|readonly|override)\s+)*([\w$]+)\s*\??\s*:\s*([\w$.]+)')
+PUNCTUATION = re.compile(r'[()\[\]{},]')
+DECORATOR = re.compile(r'@([\w$]+)\s*\(\s*(?:forwardRef\s*\(\s*\(\s*\)\s*=>\s*)?([\w$.]*)')
+# Types that say nothing about where a value comes from
+OPAQUE_TYPES = {'any', 'unknown', 'object', 'string', 'number', 'boolean', 'void', 'never', 'Promise', 'Record',
+                'Partial', 'Array', 'Map', 'Set', 'Function'}
+# NestJS injection decorators that say nothing about what is injected
+GENERIC_DECORATORS = {'Inject', 'Optional', 'Self', 'SkipSelf', 'Host'}
+
+
+def root_name(reference):
+    # this.a.b -> a, Sentry.init -> Sentry
+    parts = reference.split('.')
+    return parts[1] if parts[0] == 'this' and len(parts) > 1 else parts[0]
+
+
+def specifier_at(text, match):
+    # The match ends just after the opening quote of the specifier
+    end = text.find(text[match.end() - 1], match.end())
+    return text[match.end():end]
+
+
+def import_names(clause):
+    """
+    (local name, imported name) pairs of an import clause such as
+    `Foo, { a as b, type c }` or `* as ns`.
+    """
+    names = []
+    braces = clause.find('{')
+    head = clause[:braces] if braces >= 0 else clause
+    namespace = re.search(r'\*\s*as\s+([\w$]+)', head)
+    if namespace:
+        names.append((namespace.group(1), '*'))
+        head = head[:namespace.start()]
+    default = IDENT.search(head)
+    if default:
+        names.append((default.group(0), 'default'))
+    if braces >= 0:
+        names.extend(list_names(clause[braces + 1:clause.rfind('}')]))
+    return names
+
+
+def list_names(body, separator='as'):
+    # `a as b, type c` -> [(b, a), (c, c)]; with separator ':' for destructuring
+    names = []
+    for item in body.split(','):
+        item = re.sub(r'^\s*type\s+', '', item.split('=')[0]).strip()
+        if not item or item.startswith('...'):
+            continue
+        parts = [part.strip() for part in item.split(separator, 1)] if separator in item else [item, item]
+        imported, local = parts
+        if IDENT.fullmatch(local) and IDENT.fullmatch(imported):
+            names.append((local, imported))
+    return names
+
+
+def parse_parameters(masked, text, declarations):
+    """
+    Typed parameters of functions and constructors; constructor parameters
+    with NestJS decorators (@Inject, @InjectRepository, ...) are injections.
+    """
+    stack = []
+    for punctuation in PUNCTUATION.finditer(masked):
+        i = punctuation.start()
+        c = masked[i]
+        if c in '([{':
+            constructor = c == '(' and masked[max(0, i - 20):i].rstrip().endswith('constructor')
+            stack.append((c, constructor))
+        elif c in ')]}':
+            if stack:
+                stack.pop()
+            continue
+        if not stack or stack[-1][0] != '(':
+            continue
+        match = PARAMETER.match(masked, i + 1)
+        if not match or match.group(2) in declarations:
+            continue
+        decorator = DECORATOR.search(match.group(1))
+        declarations[match.group(2)] = {
+            'kind': 'injected' if stack[-1][1] else 'parameter',
+            'type': root_name(match.group(3)),
+            'decorator': decorator.group(1) if decorator else None,
+            'token': root_name(decorator.group(2)) if decorator and decorator.group(2) else None,
+            'line': line_of(text, match.start(2)),
+        }
+
+
+def parse_symbols(text):
+    """
+    Imports, exports, re-exports and declarations (variables, classes,
+    functions, class properties, typed and constructor-injected
+    parameters) of one TS/JS source. Declarations keep the root name of
+    their initializer (`source`) and type annotation (`type`) so they can
+    be followed to an import. Scoping is per file: the first declaration
+    of a name wins.
+    """
+    masked = mask_source(text)
+    imports = {}
+    for pattern in (IMPORT, REQUIRE, IMPORT_EQUALS):
+        for match in pattern.finditer(masked):
+            specifier = specifier_at(text, match)
+            clause = match.group(1)
+            if pattern is REQUIRE and clause.startswith('{'):
+                names = list_names(clause[1:-1], ':')
+            elif pattern is IMPORT:
+                names = import_names(clause)
+            else:
+                names = [(clause, '*')]
+            for local, imported in names:
+                imports.setdefault(local, [specifier, imported])
+
+    exports = {}
+    star_exports = []
+    for match in EXPORT_FROM.finditer(masked):
+        specifier = specifier_at(text, match)
+        clause = match.group(1)
+        if clause.startswith('{'):
+            for exported, imported in list_names(clause[1:-1]):
+                exports[exported] = [specifier, imported]
+        elif 'as' in clause:
+            exports[clause.split()[-1]] = [specifier, '*']
+        else:
+            star_exports.append(specifier)
+    for match in EXPORT_LIST.finditer(masked):
+        for exported, local in list_names(match.group(1)):
+            exports.setdefault(exported, [None, local])
+    for match in EXPORT_DECLARATION.finditer(masked):
+        exports.setdefault(match.group(2), [None, match.group(2)])
+        if match.group(1):
+            exports['default'] = [None, match.group(2)]
+    for match in EXPORT_DEFAULT.finditer(masked):
+        exports.setdefault('default', [None, match.group(1)])
+
+    declarations = {}
+    for match in CLASS.finditer(masked):
+        declarations.setdefault(match.group(1), {
+            'kind': 'class', 'source': root_name(match.group(2)) if match.group(2) else None,
+            'line': line_of(text, match.start(1))})
+    for match in FUNCTION.finditer(masked):
+        declarations.setdefault(match.group(1), {'kind': 'function', 'line': line_of(text, match.start(1))})
+    parse_parameters(masked, text, declarations)
+    for pattern in (PROPERTY, VARIABLE):
+        for match in pattern.finditer(masked):
+            name, annotation, source = match.groups()
+            if name in imports or (pattern is VARIABLE and source == 'require'):
+                continue
+            declarations.setdefault(name, {
+                'kind': 'property' if pattern is PROPERTY else 'variable',
+                'type': root_name(annotation) if annotation else None,
+                'source': root_name(source) if source else None,
+                'line': line_of(text, match.start(1))})
+    for match in DESTRUCTURING.finditer(masked):
+        if match.group(2) == 'require':
+            continue
+        for local, _ in list_names(match.group(1), ':'):
+            declarations.setdefault(local, {'kind': 'variable', 'source': root_name(match.group(2)),
+                                            'line': line_of(text, match.start(1))})
+    return {'imports': imports, 'exports': exports, 'star_exports': star_exports, 'declarations': declarations}
+
+
+def parse_file(path):
+    try:
+        with open(path, 'r', errors='replace') as f:
+            return parse_symbols(f.read())
+    except OSError:
+        return {'imports': {}, 'exports': {}, 'star_exports': [], 'declarations': {}}
+
+
+class SymbolIndex(ImportGraph):
+    """
+    Per-file symbols of the TS/JS files under `root`, on top of the import
+    graph's file walk and module resolution, plus a precomputed table of
+    where every declared or imported name comes from: the package it is
+    ultimately imported from, or the local class/function that defines it
+    (with the packages that class wraps through its injected members).
+    Looking up a service name is then one dictionary access.
+
+    Changed files are re-parsed in parallel; origins are recomputed in
+    memory (no file I/O) whenever anything changed, since an edit in one
+    file can change what names in other files resolve to.
+    """
+
+    def __init__(self, root, workers=None):
+        super().__init__(root)
+        self.workers = workers or os.cpu_count() or 1
+
+    def update(self):
+        sources, tsconfigs = self.walk()
+        changed = tsconfigs != self.tsconfigs or sources.keys() != self.files.keys()
+        if tsconfigs != self.tsconfigs:
+            self.tsconfigs = tsconfigs
+            self.tsconfig_options = {}
+            for rel_path in tsconfigs:
+                try:
+                    self.tsconfig_options[rel_path] = load_tsconfig(self.root, rel_path)
+                except (OSError, ValueError) as e:
+                    print(f"Skipping unreadable {rel_path}: {e}")
+        stale = [rel_path for rel_path, stat in sources.items()
+                 if rel_path not in self.files or self.files[rel_path]['stat'] != stat]
+        paths = [os.path.join(self.root, rel_path) for rel_path in stale]
+        if self.workers > 1 and len(paths) > 100:
+            with Pool(self.workers) as pool:
+                parsed = pool.map(parse_file, paths, chunksize=64)
+        else:
+            parsed = [parse_file(path) for path in paths]
+        files = {rel_path: self.files[rel_path] for rel_path in sources if rel_path in self.files}
+        for rel_path, symbols in zip(stale, parsed):
+            files[rel_path] = {'stat': sources[rel_path], 'symbols': symbols}
+        self.files = files
+        if changed or stale:
+            self.link_origins()
+        return len(stale)
+
+    # --- origins ----------------------------------------------------------
+
+    def link_origins(self):
+        self.memo = {}
+        for rel_path, entry in self.files.items():
+            symbols = entry['symbols']
+            names = set(symbols['declarations']) | set(symbols['imports'])
+            origins = {name: self.origin(rel_path, name) for name in sorted(names)}
+            entry['origins'] = {name: origin for name, origin in origins.items() if origin}
+        del self.memo
+
+    def resolve_import(self, rel_path, specifier, imported, seen):
+        target = self.resolve(rel_path, specifier, self.files)
+        if target:
+            return self.export_origin(target, imported, seen)
+        if specifier.startswith('.'):
+            return None
+        return {'library': package_name(specifier), 'symbol': imported, 'chain': []}
+
+    def export_origin(self, rel_path, exported, seen):
+        symbols = self.files[rel_path]['symbols']
+        if exported == '*':
+            return {'library': None, 'symbol': '*', 'defined_in': rel_path, 'chain': []}
+        export = symbols['exports'].get(exported)
+        if export and export[0] is None:
+            return self.origin(rel_path, export[1], seen)
+        if export:
+            return self.resolve_import(rel_path, export[0], export[1], seen)
+        for specifier in symbols['star_exports']:
+            target = self.resolve(rel_path, specifier, self.files)
+            origin = self.export_origin(target, exported, seen) if target else None
+            if origin:
+                return origin
+        # Exported in a way the patterns miss, e.g. `export @Decorator() class`
+        return self.origin(rel_path, exported, seen) if exported in symbols['declarations'] else None
+
+    def origin(self, rel_path, name, seen=None):
+        """
+        Where `name` in rel_path comes from. `seen` maps the lookups on the
+        current path to their depth; a lookup already on it is a cycle
+        (e.g. two services injecting each other with forwardRef) and is cut.
+        A result that depends on a cut above its own lookup is incomplete
+        from other starting points, so it is not memoized.
+        """
+        key = (rel_path, name)
+        if key in self.memo:
+            return self.memo[key]
+        if seen is None:
+            seen = {}
+            self.cut = len(seen)
+        if key in seen:
+            self.cut = min(self.cut, seen[key])
+            return None
+        depth = len(seen)
+        seen[key] = depth
+        outer_cut = self.cut
+        self.cut = depth
+        symbols = self.files[rel_path]['symbols']
+        declaration = symbols['declarations'].get(name)
+        result = None
+        if declaration:
+            step = f"{rel_path}:{declaration['line']} {name}"
+            if declaration['kind'] == 'class':
+                references = [declaration.get('source')]
+            elif declaration['kind'] in ('injected', 'parameter', 'property'):
+                references = [declaration.get('type'), declaration.get('source'), declaration.get('token'),
+                              declaration.get('decorator')]
+            else:
+                references = [declaration.get('source'), declaration.get('type')]
+            for reference in references:
+                if not reference or reference == name or reference in OPAQUE_TYPES or reference in GENERIC_DECORATORS:
+                    continue
+                origin = self.origin(rel_path, reference, seen)
+                if origin and (origin['library'] or declaration['kind'] != 'class'):
+                    result = dict(origin, chain=[step] + origin['chain'])
+                    break
+            if result is None:
+                result = {'library': None, 'symbol': name, 'defined_in': rel_path, 'line': declaration['line'],
+                          'chain': [step]}
+                if declaration['kind'] == 'class':
+                    result['wraps'] = self.wrapped_libraries(rel_path, seen)
+        elif name in symbols['imports']:
+            specifier, imported = symbols['imports'][name]
+            origin = self.resolve_import(rel_path, specifier, imported, seen)
+            if origin:
+                result = dict(origin, chain=[f"{rel_path} {name} from {specifier}"] + origin['chain'])
+        del seen[key]
+        if self.cut >= depth:
+            self.memo[key] = result
+        self.cut = min(outer_cut, self.cut)
+        return result
+
+    def wrapped_libraries(self, rel_path, seen):
+        # Packages behind the injected members and properties of a local class
+        libraries = set()
+        for member, declaration in self.files[rel_path]['symbols']['declarations'].items():
+            if declaration['kind'] in ('injected', 'property'):
+                origin = self.origin(rel_path, member, seen)
+                if origin:
+                    libraries.update([origin['library']] if origin['library'] else origin.get('wraps', []))
+        return sorted(libraries)
+
+    # --- queries ----------------------------------------------------------
+
+    def lookup(self, rel_path, service):
+        """
+        Origin of a detected service name such as `workspaceDataSource`,
+        `this.fooRepository` or `Sentry`, as seen from rel_path.
+        """
+        origins = self.files.get(rel_path, {}).get('origins', {})
+        for name in IDENT.findall(service or ''):
+            if name != 'this' and name in origins:
+                return origins[name]
+        return None
+
+    @classmethod
+    def open(cls, root, path, workers=None):
+        index = cls.load(path, root) if os.path.exists(path) else cls(root)
+        index.workers = workers or os.cpu_count() or 1
+        parsed = index.update()
+        print(f"Symbol index: {len(index.files)} files, {parsed} (re)parsed")
+        index.save(path)
+        return index
+
+
+def annotate_results(records, index, path_of):
+    """
+    Add an `origin` to every detected service of the records, in place.
+    path_of maps a record filename to a path relative to the index root.
+    Returns (services, resolved to a package).
+    """
+    services = 0
+    resolved = 0
+    for record in records:
+        message = record.get('message')
+        detected = message.get('detected_data_sink_services') if isinstance(message, dict) else None
+        for service in detected or []:
+            if not isinstance(service, dict):
+                continue
+            origin = index.lookup(path_of(record['filename']), service.get('service'))
+            service['origin'] = origin
+            services += 1
+            resolved += bool(origin and (origin['library'] or origin.get('wraps')))
+    return services, resolved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace detected service names back to the libraries they come from")
+    parser.add_argument("root", help="repository root, e.g. /home/suchitg/DataCare/twenty")
+    parser.add_argument("--index", default="symbol_index.json", help="persisted symbol index, updated incrementally")
+    parser.add_argument("--results", default="service_extraction.json", help="results to annotate in place")
+    parser.add_argument("--prefix", default="twenty/", help="prefix of the result filenames relative to the root")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes, defaults to the number of cores")
+    parser.add_argument("--lookup", nargs=2, metavar=("FILE", "NAME"), help="print the origin of one name and exit")
+    args = parser.parse_args()
+
+    index = SymbolIndex.open(args.root, args.index, args.workers)
+    if args.lookup:
+        print(json.dumps(index.lookup(*args.lookup), indent=4))
+        return
+    with open(args.results, 'r') as f:
+        records = json.load(f)
+    services, resolved = annotate_results(
+        records, index, lambda filename: filename[len(args.prefix):] if filename.startswith(args.prefix) else filename)
+    with open(args.results, 'w') as f:
+        json.dump(records, f, indent=4)
+    print(f"Traced {resolved} of {services} services in {args.results} to a library")
+
+
+if __name__ == "__main__":
+    main()
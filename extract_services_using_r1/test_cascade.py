@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import unittest
+
+from cascade import Cascade, make_tiers
+
+SOURCE = """
+export class UserService {
+  async create(input) {
+    this.logger.log('creating user');
+    return this.userRepository.save(input);
+  }
+}
+"""
+
+
+def record(services, confidence=0.9):
+    return {"message": {"detected_data_sink_services": [{"service": name} for name in services],
+                        "confidence": confidence}}
+
+
+class RulesTriggerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cascade = Cascade(make_tiers(["fast"]), triggers=("invalid", "confidence", "rules"))
+
+    def test_names_compare_without_case_or_this(self):
+        self.assertIsNone(self.cascade.check(0, record(["this.UserRepository"]), SOURCE))
+
+    def test_logger_candidates_are_not_required(self):
+        self.assertIsNone(self.cascade.check(0, record(["userRepository"]), SOURCE))
+
+    def test_missing_persisting_service_escalates(self):
+        self.assertEqual(self.cascade.check(0, record(["logger"]), SOURCE), "rules")
+
+
+if __name__ == "__main__":
+    unittest.main()
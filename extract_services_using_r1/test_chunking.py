@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+import unittest
+
+from chunking import merge_messages
+
+
+class MergeMessagesTest(unittest.TestCase):
+
+    def test_lowest_chunk_confidence_is_kept(self):
+        merged = merge_messages([
+            {"detected_data_sink_services": [{"service": "userRepository", "evidence": "save(u)"}], "confidence": 0.9},
+            {"detected_data_sink_services": [{"service": "httpService", "evidence": "post(x)"}], "confidence": 0.8},
+        ])
+        self.assertEqual([s["service"] for s in merged["detected_data_sink_services"]], ["userRepository", "httpService"])
+        self.assertEqual(merged["confidence"], 0.8)
+
+    def test_no_confidence_when_a_chunk_lacks_one(self):
+        merged = merge_messages([
+            {"detected_data_sink_services": [], "confidence": 0.9},
+            {"detected_data_sink_services": []},
+        ])
+        self.assertNotIn("confidence", merged)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import unittest
+
+from sink_rules import covered, extract
+
+NESTED = """
+export class UserService {
+  async create(input) {
+    return this.userRepository.save({
+      ...input,
+      avatar: await this.fileStorageService.upload(input.avatar),
+      crm: await this.httpService.post('https://crm', input),
+      score: await this.analyticsService.track(input),
+    });
+  }
+}
+"""
+
+SAME_LINE = """
+export class Sync {
+  async run(u, url) {
+    await this.repo.save(u); await fetch(url);
+  }
+}
+"""
+
+
+class NestedCallsTest(unittest.TestCase):
+
+    def test_calls_in_arguments_are_candidates(self):
+        candidates, _ = extract(NESTED)
+        self.assertEqual([c["service"] for c in candidates], ["userRepository", "fileStorageService", "httpService"])
+        self.assertEqual([(c["start_line"], c["end_line"]) for c in candidates], [(4, 9), (6, 6), (7, 7)])
+
+    def test_calls_in_arguments_are_suspects(self):
+        candidates, suspects = extract(NESTED)
+        self.assertEqual(suspects, ["analyticsService.track (line 8)"])
+        self.assertFalse(covered(candidates, suspects))
+
+    def test_second_call_on_the_same_line(self):
+        candidates, suspects = extract(SAME_LINE)
+        self.assertEqual([c["service"] for c in candidates], ["repo"])
+        self.assertEqual(suspects, ["fetch (line 4)"])
+        self.assertFalse(covered(candidates, suspects))
+
+    def test_query_builder_chain_is_reported_once(self):
+        candidates, suspects = extract("await this.repo.createQueryBuilder().insert().into(User).values(v).execute();\n")
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(suspects, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,30 +1,14 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import os
 
-def generate_html(json_file_path):
-    """
-    Generate an HTML file to visualize the service extraction data
-    """
-    # Read the JSON file
-    try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
-            print(f"Successfully loaded JSON data with {len(data)} items")
-    except Exception as e:
-        print(f"Error loading JSON file: {e}")
-        return None
-    
-    # Create HTML content
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Service Extraction Visualization</title>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-        <style>
+from evidence_locator import github_anchor
+from search_index import SEARCH_SCRIPT, build_search_index, dump_index
+
+REPO_URL = "https://github.com/twentyhq/twenty"
+
+PAGE_STYLE = """\
             html, body {
                 margin: 0;
                 padding: 0;
@@ -91,6 +75,18 @@ def generate_html(json_file_path):
                 white-space: pre-wrap;
                 margin: 10px 0;
             }
+            .evidence-location {
+                font-size: 0.85rem;
+            }
+            .evidence-missing {
+                color: #b02a37;
+                font-size: 0.85rem;
+                font-weight: bold;
+            }
+            .evidence-unknown {
+                color: #6c757d;
+                font-size: 0.85rem;
+            }
             .reasoning-block {
                 background-color: #fff3cd;
                 padding: 15px;
@@ -128,7 +124,72 @@ def generate_html(json_file_path):
             .sidebar-service:hover {
                 background-color: rgba(255,255,255,0.1);
             }
-        </style>
+"""
+
+
+def github_url(filename, start_line=None, end_line=None, repo_url=REPO_URL, revision="main"):
+    parts = filename.split("/")
+    parts.pop(0)
+    if start_line:
+        # Line anchors need the blob view
+        return f"{repo_url}/blob/{revision}/" + "/".join(parts) + github_anchor(start_line, end_line)
+    return f"{repo_url}/tree/{revision}/" + "/".join(parts)
+
+
+def evidence_location(filename, service_data, repo_url=REPO_URL, revision="main"):
+    """
+    Link to the evidence lines (set by evidence_locator.py), "" when the
+    evidence was not found in the file, False when it could not be looked
+    up (empty evidence), None when it was not looked up.
+    """
+    if service_data.get("start_line") and filename != "Unknown file":
+        return github_url(filename, service_data["start_line"], service_data.get("end_line"), repo_url, revision)
+    if "evidence_found" in service_data and service_data["evidence_found"] is None:
+        return False
+    return "" if service_data.get("evidence_found") is False else None
+
+
+def item_revision(item, revision):
+    # A record read from a git revision (ext_service.py --source REPO@REV) links to that commit
+    return item.get("revision") or revision or "main"
+
+
+def print_service_counts(service_counts):
+    print("\nService Counts:")
+    print("-" * 40)
+    total_services = 0
+    for service, count in sorted(service_counts.items()):
+        print(f"{service}: {count}")
+        total_services += count
+    print("-" * 40)
+    print(f"Total services detected: {total_services}")
+    print(f"Unique services found: {len(service_counts)}\n")
+
+
+def generate_html(json_file_path, repo_url=REPO_URL, revision=None):
+    """
+    Generate an HTML file to visualize the service extraction data
+    """
+    # Read the JSON file
+    try:
+        with open(json_file_path, 'r') as f:
+            data = json.load(f)
+            print(f"Successfully loaded JSON data with {len(data)} items")
+    except Exception as e:
+        print(f"Error loading JSON file: {e}")
+        return None
+    
+    # Create HTML content
+    parts = ["""
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Service Extraction Visualization</title>
+        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
+        <style>
+""" + PAGE_STYLE + """        </style>
     </head>
     <body>
         <div class="sidebar">
@@ -149,7 +210,7 @@ def generate_html(json_file_path):
             
             
             <div id="file-cards">
-            """
+            """]
     
     
     # Initialize service counts
@@ -157,19 +218,18 @@ def generate_html(json_file_path):
 
     # Generate cards for each file
     for item in data:
-        filename = item.get("filename", "Unknown file")
+        source_filename = item.get("filename", "Unknown file")
+        filename = source_filename
+        file_revision = item_revision(item, revision)
         if filename != "Unknown file":
-            filename = filename.split("/")
-            filename.pop(0)
-            filename = "/".join(filename)
-            filename = "https://github.com/twentyhq/twenty/tree/main/" + filename
+            filename = github_url(filename, repo_url=repo_url, revision=file_revision)
         message = item.get("message", {})
         reasoning = item.get("reasoning", "")
         
         detected_services = message.get("detected_data_sink_services", [])
         
         
-        html_content += f"""
+        parts.append(f"""
             <div class="card file-card">
                 <div class="card-header d-flex justify-content-between align-items-center">
                     <div class="file-path"><a href="{filename}" target="_blank" style="text-decoration: none; color: inherit;">{filename}</a></div>
@@ -178,7 +238,7 @@ def generate_html(json_file_path):
                 <div class="card-body">
                     <h5>Detected Services:</h5>
                     <div class="services-container">
-        """
+        """)
         
         # Add service badges
         for service_data in detected_services:
@@ -188,18 +248,26 @@ def generate_html(json_file_path):
             
             # Count services
             service_counts[service_name] = service_counts.get(service_name, 0) + 1
+            location = evidence_location(source_filename, service_data, repo_url, file_revision)
+            if location:
+                lines = f"{service_data['start_line']}-{service_data.get('end_line')}"
+                location = f'<a class="evidence-location" href="{location}" target="_blank">lines {lines}</a>'
+            elif location == "":
+                location = '<div class="evidence-missing">Evidence not found in the file</div>'
+            elif location is False:
+                location = '<div class="evidence-unknown">Evidence location unknown</div>'
             
-            html_content += f"""
+            parts.append(f"""
                         <div class="service-entry mb-3">
                             <div class="service-badge service-item" data-service="{service_name}">{service_name}</div>
-                            <div class="evidence-block">{evidence}</div>
+                            <div class="evidence-block">{evidence}</div>{location or ""}
                             <div class="reasoning-block">
                                 <strong>Reasoning:</strong> {service_reasoning}
                             </div>
                         </div>
-            """
+            """)
         
-        html_content += """
+        parts.append("""
                     </div>
                     <div class="mt-3">
                         <div class="d-flex align-items-center" onclick="toggleReasoning(this)" style="cursor: pointer;">
@@ -212,16 +280,21 @@ def generate_html(json_file_path):
                     </div>
                 </div>
             </div>
-        """.format(reasoning)
+        """.format(reasoning))
     
+    # Keyword and service search are lookups in an index built here
+    search_index = build_search_index(data, os.path.join(os.path.dirname(json_file_path), "search_index_state.json"))
+
     # Close the HTML content
-    html_content += """
+    parts.append("""
                     </div>
                 </div>
             </div>
         </div>
         
         <script>
+            const SEARCH_INDEX = """ + dump_index(search_index) + """;
+""" + SEARCH_SCRIPT + """
             // Toggle card functionality
             function toggleCard(icon) {
                 const cardBody = icon.closest('.card-header').nextElementSibling;
@@ -255,52 +328,21 @@ def generate_html(json_file_path):
                 filterCards(this.value, false);
             });
             
-            // Filter cards by search term
+            // Filter cards by search term; card i is file id i of the index
+            const fileCards = Array.from(document.querySelectorAll('.file-card'));
             function filterCards(searchTerm, exactMatch = false) {
-                searchTerm = searchTerm.toLowerCase();
-                const cards = document.querySelectorAll('.file-card');
-                
-                cards.forEach(card => {
-                    if (exactMatch) {
-                        // For exact match, check the service-item elements
-                        const serviceItems = card.querySelectorAll('.service-item');
-                        let hasMatch = false;
-                        serviceItems.forEach(item => {
-                            if (item.getAttribute('data-service').toLowerCase() === searchTerm) {
-                                hasMatch = true;
-                            }
-                        });
-                        card.style.display = hasMatch ? 'block' : 'none';
-                    } else {
-                        // For keyword search, check the entire card text
-                        const cardText = card.textContent.toLowerCase();
-                        card.style.display = cardText.includes(searchTerm) ? 'block' : 'none';
-                    }
+                const ids = searchFiles(searchTerm, exactMatch);
+                const visible = ids === null ? null : new Set(ids);
+                fileCards.forEach((card, id) => {
+                    card.style.display = visible === null || visible.has(id) ? 'block' : 'none';
                 });
             }
             
             
-            // Process services data for the sidebar
-            const servicesData = {};
-            let allSidebarServices = [];
-            document.querySelectorAll('.service-item').forEach(item => {
-                const service = item.getAttribute('data-service');
-                if (service) {  // Only count if service attribute exists and is not null
-                    servicesData[service] = (servicesData[service] || 0) + 1;
-                }
-            });
-            console.log('Processed services data:', servicesData);
-
-            // Sidebar unique services list
+            // Sidebar unique services list, counted in Python
             const uniqueServicesList = document.getElementById('unique-services-list');
-            if (!uniqueServicesList) {
-                console.error('Could not find unique-services-list element');
-            } else {
-                console.log('Found unique-services-list element');
-                allSidebarServices = Object.entries(servicesData).map(([service, count]) => ({ service, count }));
-                renderSidebarServices(allSidebarServices);
-                console.log('Updated sidebar HTML');
-            }
+            const allSidebarServices = SEARCH_INDEX.serviceCounts.map(([service, count]) => ({ service, count }));
+            renderSidebarServices(allSidebarServices);
 
             // Sidebar search functionality
             document.getElementById('sidebar-search').addEventListener('input', function() {
@@ -335,37 +377,375 @@ def generate_html(json_file_path):
         <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
     </body>
     </html>
-    """
+    """)
     
     # Write to HTML file
     
     # Print service counts
-    print("\nService Counts:")
-    print("-" * 40)
-    total_services = 0
-    for service, count in sorted(service_counts.items()):
-        print(f"{service}: {count}")
-        total_services += count
-    print("-" * 40)
-    print(f"Total services detected: {total_services}")
-    print(f"Unique services found: {len(service_counts)}\n")
+    print_service_counts(service_counts)
 
     output_file = os.path.join(os.path.dirname(json_file_path), "index.html")
     try:
         with open(output_file, 'w') as f:
-            f.write(html_content)
+            f.writelines(parts)
         print(f"HTML visualization created at: {output_file}")
         return output_file
     except Exception as e:
         print(f"Error writing HTML file: {e}")
         return None
 
+LAZY_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Service Extraction Visualization</title>
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
+    <style>
+""" + PAGE_STYLE + """    </style>
+</head>
+<body>
+    <div class="sidebar">
+        <div class="sidebar-title">Unique Services</div>
+        <input type="text" id="sidebar-search" class="form-control form-control-sm mb-3" placeholder="Search services...">
+        <div id="unique-services-list"></div>
+    </div>
+    <div class="main-content">
+        <h1 class="my-4 text-center">Service Extraction Visualization</h1>
+        <div class="row mb-4">
+            <div class="col">
+                <input type="text" id="search-input" class="form-control" placeholder="Search for files, services, or keywords...">
+                <div id="match-count" class="text-muted small"></div>
+            </div>
+        </div>
+        <div id="top-spacer"></div>
+        <div id="file-cards"></div>
+        <div id="bottom-spacer"></div>
+    </div>
+
+    <!-- REPORT_DATA: {files: [[filename, url, [[service, evidence, reasoning, location], ...]], ...], shardSize}
+         location: link to the evidence lines, "" when not found in the file, false when it could
+         not be looked up, null when it was not looked up
+         SEARCH_INDEX: see search_index.build_search_index -->
+    <script src="data.js"></script>
+    <script src="search_index.js"></script>
+    <script>
+        const files = REPORT_DATA.files;
+        const cardsContainer = document.getElementById('file-cards');
+        let matches = files.map((_, id) => id);
+
+        function el(tag, className, text) {
+            const node = document.createElement(tag);
+            if (className) node.className = className;
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }
+
+        function renderCard(id) {
+            const [filename, url, services] = files[id];
+            const card = el('div', 'card file-card');
+            card.dataset.id = id;
+            const header = el('div', 'card-header d-flex justify-content-between align-items-center');
+            const path = el('div', 'file-path');
+            const link = el('a', null, url || filename);
+            link.href = url;
+            link.target = '_blank';
+            link.style = 'text-decoration: none; color: inherit;';
+            path.appendChild(link);
+            const toggle = el('span', 'toggle-icon', '▼');
+            toggle.onclick = () => toggleCard(toggle);
+            header.append(path, toggle);
+
+            const body = el('div', 'card-body');
+            body.appendChild(el('h5', null, 'Detected Services:'));
+            const container = el('div', 'services-container');
+            for (const [service, evidence, reasoning, location] of services) {
+                const entry = el('div', 'service-entry mb-3');
+                const badge = el('div', 'service-badge service-item', service);
+                badge.onclick = () => filterByService(service);
+                const why = el('div', 'reasoning-block');
+                why.append(el('strong', null, 'Reasoning:'), ' ' + reasoning);
+                entry.append(badge, el('div', 'evidence-block', evidence));
+                if (location) {
+                    const lines = el('a', 'evidence-location', 'lines ' + location.split('#L')[1].replace('L', ''));
+                    lines.href = location;
+                    lines.target = '_blank';
+                    entry.appendChild(lines);
+                } else if (location === '') {
+                    entry.appendChild(el('div', 'evidence-missing', 'Evidence not found in the file'));
+                } else if (location === false) {
+                    entry.appendChild(el('div', 'evidence-unknown', 'Evidence location unknown'));
+                }
+                entry.appendChild(why);
+                container.appendChild(entry);
+            }
+            body.appendChild(container);
+
+            // The R1 trace is only fetched when expanded
+            const trace = el('div', 'mt-3');
+            const traceHeader = el('div', 'd-flex align-items-center');
+            traceHeader.style.cursor = 'pointer';
+            const traceIcon = el('i', 'toggle-icon ms-2', '▶');
+            traceHeader.append(el('h5', 'mb-0', 'LLM Reasoning Trace'), traceIcon);
+            const traceContent = el('div', 'reasoning-content');
+            traceContent.style.display = 'none';
+            traceHeader.onclick = () => toggleReasoning(id, traceContent, traceIcon);
+            trace.append(traceHeader, traceContent);
+            body.appendChild(trace);
+
+            card.append(header, body);
+            return card;
+        }
+
+        // Virtual scrolling: only the cards around the viewport are in the DOM,
+        // between two spacers as tall as the cards above and below them. Heights
+        // are estimated until a card has been rendered and measured
+        const ESTIMATED_HEIGHT = 300;
+        const OVERSCAN = 1000;  // px rendered beyond each edge of the viewport
+        const CACHE_SIZE = 200;  // detached cards kept, toggles and all, for scrolling back
+        const topSpacer = document.getElementById('top-spacer');
+        const bottomSpacer = document.getElementById('bottom-spacer');
+        const heights = new Map();
+        const cardCache = new Map();
+        let windowStart = -1;
+        let windowEnd = -1;
+        let updateQueued = false;
+
+        function heightOf(id) {
+            return heights.get(id) || ESTIMATED_HEIGHT;
+        }
+
+        function cardFor(id) {
+            const card = cardCache.get(id) || renderCard(id);
+            // Most recently used last
+            cardCache.delete(id);
+            cardCache.set(id, card);
+            return card;
+        }
+
+        function updateWindow(force) {
+            updateQueued = false;
+            const listTop = topSpacer.getBoundingClientRect().top + window.scrollY;
+            const viewTop = window.scrollY - listTop - OVERSCAN;
+            const viewBottom = window.scrollY + window.innerHeight - listTop + OVERSCAN;
+            let start = 0;
+            let offset = 0;
+            while (start < matches.length && offset + heightOf(matches[start]) < viewTop) {
+                offset += heightOf(matches[start++]);
+            }
+            let end = start;
+            let bottom = offset;
+            while (end < matches.length && bottom < viewBottom) {
+                bottom += heightOf(matches[end++]);
+            }
+            if (force || start !== windowStart || end !== windowEnd) {
+                windowStart = start;
+                windowEnd = end;
+                cardsContainer.replaceChildren(...matches.slice(start, end).map(cardFor));
+                for (const [id, card] of cardCache) {
+                    if (cardCache.size <= CACHE_SIZE) break;
+                    if (!card.isConnected) cardCache.delete(id);
+                }
+            }
+            let measured = false;
+            for (const card of cardsContainer.children) {
+                const height = card.offsetHeight + parseFloat(getComputedStyle(card).marginBottom);
+                if (heights.get(+card.dataset.id) !== height) {
+                    heights.set(+card.dataset.id, height);
+                    measured = true;
+                }
+            }
+            let rest = 0;
+            for (let i = end; i < matches.length; i++) rest += heightOf(matches[i]);
+            topSpacer.style.height = `${offset}px`;
+            bottomSpacer.style.height = `${rest}px`;
+            // New measurements move the window; they settle once every visible card is measured
+            if (measured) scheduleUpdate();
+        }
+
+        function scheduleUpdate() {
+            if (!updateQueued) {
+                updateQueued = true;
+                requestAnimationFrame(() => updateWindow(false));
+            }
+        }
+        window.addEventListener('scroll', scheduleUpdate, {passive: true});
+        window.addEventListener('resize', scheduleUpdate);
+
+        function showMatches(ids) {
+            matches = ids;
+            document.getElementById('match-count').textContent = `${ids.length} of ${files.length} files`;
+            const listTop = topSpacer.getBoundingClientRect().top + window.scrollY;
+            if (window.scrollY > listTop) window.scrollTo(0, listTop);
+            updateWindow(true);
+        }
+
+        function toggleCard(icon) {
+            const cardBody = icon.closest('.card-header').nextElementSibling;
+            const hidden = cardBody.style.display === 'none';
+            cardBody.style.display = hidden ? 'block' : 'none';
+            icon.textContent = hidden ? '▼' : '▶';
+            scheduleUpdate();
+        }
+
+        // Reasoning traces live in reasoning/<shard>.js, each calling loadReasoningShard().
+        // Script tags rather than fetch() so the report also works from file://
+        const shards = {};
+        const shardWaiters = {};
+        function loadReasoningShard(shard, traces) {
+            shards[shard] = traces;
+            (shardWaiters[shard] || []).forEach(resolve => resolve(traces));
+            delete shardWaiters[shard];
+        }
+        function fetchShard(shard) {
+            if (shards[shard]) return Promise.resolve(shards[shard]);
+            return new Promise(resolve => {
+                if (!shardWaiters[shard]) {
+                    shardWaiters[shard] = [];
+                    const script = document.createElement('script');
+                    script.src = `reasoning/${shard}.js`;
+                    document.body.appendChild(script);
+                }
+                shardWaiters[shard].push(resolve);
+            });
+        }
+
+        function toggleReasoning(id, content, icon) {
+            if (content.style.display === 'none') {
+                content.style.display = 'block';
+                icon.textContent = '▼';
+                if (!content.dataset.loaded) {
+                    content.dataset.loaded = '1';
+                    content.textContent = 'Loading...';
+                    const shard = Math.floor(id / REPORT_DATA.shardSize);
+                    fetchShard(shard).then(traces => {
+                        content.replaceChildren(el('p', 'mt-2', traces[id - shard * REPORT_DATA.shardSize]));
+                        scheduleUpdate();
+                    });
+                }
+            } else {
+                content.style.display = 'none';
+                icon.textContent = '▶';
+            }
+            scheduleUpdate();
+        }
+
+""" + SEARCH_SCRIPT + """
+        function filterCards(searchTerm, exactMatch = false) {
+            const ids = searchFiles(searchTerm, exactMatch);
+            showMatches(ids === null ? files.map((_, id) => id) : ids);
+        }
+        document.getElementById('search-input').addEventListener('input', function() {
+            filterCards(this.value, false);
+        });
+
+        function filterByService(serviceName) {
+            document.getElementById('search-input').value = serviceName;
+            filterCards(serviceName, true);
+        }
+
+        const uniqueServicesList = document.getElementById('unique-services-list');
+        function renderSidebarServices(services) {
+            const fragment = document.createDocumentFragment();
+            for (const [service, count] of services) {
+                const item = el('div', 'sidebar-service');
+                item.onclick = () => filterByService(service);
+                item.append(el('span', 'service-count', count), el('div', 'service-badge', service));
+                fragment.appendChild(item);
+            }
+            uniqueServicesList.replaceChildren(fragment);
+        }
+        document.getElementById('sidebar-search').addEventListener('input', function() {
+            const searchTerm = this.value.toLowerCase();
+            renderSidebarServices(SEARCH_INDEX.serviceCounts.filter(([service]) => service.toLowerCase().includes(searchTerm)));
+        });
+
+        renderSidebarServices(SEARCH_INDEX.serviceCounts);
+        showMatches(matches);
+    </script>
+</body>
+</html>
+"""
+
+
+def dump_compact(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+def generate_lazy_html(json_file_path, shard_size=100, repo_url=REPO_URL, revision=None):
+    """
+    Generate a report directory next to the JSON file: an index.html shell,
+    data.js with the compact card data, and the R1 reasoning traces split
+    into reasoning/<n>.js shards that are only loaded when a trace is
+    expanded. The card list is virtualized: only the cards in and near the
+    viewport are in the DOM, between spacers that keep the scroll height.
+    """
+    try:
+        with open(json_file_path, 'r') as f:
+            data = json.load(f)
+            print(f"Successfully loaded JSON data with {len(data)} items")
+    except Exception as e:
+        print(f"Error loading JSON file: {e}")
+        return None
+
+    output_dir = os.path.join(os.path.dirname(json_file_path), "report")
+    os.makedirs(os.path.join(output_dir, "reasoning"), exist_ok=True)
+    service_counts = {}
+
+    with open(os.path.join(output_dir, "search_index.js"), 'w') as index_file:
+        search_index = build_search_index(data, os.path.join(output_dir, "search_index_state.json"))
+        index_file.write(f"const SEARCH_INDEX = {dump_index(search_index)};\n")
+
+    with open(os.path.join(output_dir, "data.js"), 'w') as data_file:
+        data_file.write("const REPORT_DATA = {\"files\":[\n")
+        shard = []
+        for file_id, item in enumerate(data):
+            filename = item.get("filename", "Unknown file")
+            file_revision = item_revision(item, revision)
+            services = []
+            for service_data in item.get("message", {}).get("detected_data_sink_services", []):
+                service_name = service_data.get("service", "Unknown")
+                service_counts[service_name] = service_counts.get(service_name, 0) + 1
+                services.append([service_name, service_data.get("evidence", ""), service_data.get("reasoning", ""),
+                                 evidence_location(filename, service_data, repo_url, file_revision)])
+            url = github_url(filename, repo_url=repo_url, revision=file_revision) if filename != "Unknown file" else ""
+            data_file.write(("," if file_id else "") + dump_compact([filename, url, services]) + "\n")
+
+            shard.append(item.get("reasoning", ""))
+            if len(shard) == shard_size or file_id == len(data) - 1:
+                with open(os.path.join(output_dir, "reasoning", f"{file_id // shard_size}.js"), 'w') as shard_file:
+                    shard_file.write(f"loadReasoningShard({file_id // shard_size},{dump_compact(shard)});\n")
+                shard = []
+        data_file.write(f"],\"shardSize\":{shard_size}}};\n")
+
+    print_service_counts(service_counts)
+
+    output_file = os.path.join(output_dir, "index.html")
+    with open(output_file, 'w') as f:
+        f.write(LAZY_PAGE)
+    print(f"HTML visualization created at: {output_file}")
+    return output_file
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Visualize service_extraction.json as an HTML report")
+    parser.add_argument("--lazy", action="store_true",
+                        help="write report/ with separate data and reasoning shards, rendered on demand")
+    parser.add_argument("--shard-size", type=int, default=100, help="reasoning traces per shard in --lazy mode")
+    parser.add_argument("--repo-url", default=REPO_URL, help="repository the file links point to")
+    parser.add_argument("--revision", help="branch or commit to link to, for records without their own "
+                                           "revision (default: main)")
+    args = parser.parse_args()
+
     # Path to the JSON file
     json_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service_extraction.json")
     
     # Generate the HTML file
-    html_file = generate_html(json_file_path)
+    if args.lazy:
+        html_file = generate_lazy_html(json_file_path, shard_size=args.shard_size, repo_url=args.repo_url,
+                                       revision=args.revision)
+    else:
+        html_file = generate_html(json_file_path, repo_url=args.repo_url, revision=args.revision)
     
     print(f"\nVisualization created at: {html_file}")
     print("You can open this file in your web browser to view the visualization.")